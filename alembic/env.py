@@ -8,7 +8,7 @@ from alembic import context
 
 # Import your Base and models
 from app.database import Base
-from app.models import Experiment, Metric, Artifact
+from app.models import Experiment, Metric, MetricSummary, Artifact
 
 # this is the Alembic Config object, which provides
 # access to the values within the .ini file in use.
@@ -0,0 +1,26 @@
+"""Store experiment tags as JSONB and index them with GIN
+
+Tag filters are phrased as containment (@>) queries, which the
+jsonb_path_ops operator class supports with a much smaller index.
+"""
+from alembic import op
+import sqlalchemy as sa
+
+# revision identifiers
+revision = '003'
+down_revision = '002'
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    op.execute("ALTER TABLE experiments ALTER COLUMN tags TYPE JSONB USING tags::jsonb")
+    op.execute("""
+        CREATE INDEX IF NOT EXISTS ix_experiments_tags_gin
+        ON experiments USING GIN (tags jsonb_path_ops)
+    """)
+
+
+def downgrade() -> None:
+    op.execute("DROP INDEX IF EXISTS ix_experiments_tags_gin")
+    op.execute("ALTER TABLE experiments ALTER COLUMN tags TYPE JSON USING tags::json")
@@ -0,0 +1,32 @@
+"""Add composite indexes for metric lookups
+
+(experiment_id, metric_name, step) serves step-ordered history reads and
+the per-metric summary; (experiment_id, timestamp) serves time-range reads.
+"""
+from alembic import op
+
+# revision identifiers
+revision = '004'
+down_revision = '003'
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    op.create_index(
+        'ix_metrics_exp_name_step',
+        'metrics',
+        ['experiment_id', 'metric_name', 'step']
+    )
+    op.create_index(
+        'ix_metrics_exp_timestamp',
+        'metrics',
+        ['experiment_id', 'timestamp']
+    )
+    # Refresh planner statistics so the new indexes are picked up immediately
+    op.execute("ANALYZE metrics")
+
+
+def downgrade() -> None:
+    op.drop_index('ix_metrics_exp_timestamp', table_name='metrics')
+    op.drop_index('ix_metrics_exp_name_step', table_name='metrics')
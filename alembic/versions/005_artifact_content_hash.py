@@ -0,0 +1,31 @@
+"""Add content hash to artifacts for content-addressed storage
+
+Artifacts uploaded from now on are stored by SHA-256 digest, so the
+filename no longer appears in the path; per-experiment filename
+uniqueness moves to a database constraint. Rows from before this
+revision keep a NULL hash and their original path.
+"""
+from alembic import op
+import sqlalchemy as sa
+
+# revision identifiers
+revision = '005'
+down_revision = '004'
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    op.add_column('artifacts', sa.Column('content_hash', sa.String(64), nullable=True))
+    op.create_index('ix_artifacts_content_hash', 'artifacts', ['content_hash'])
+    op.create_unique_constraint(
+        'uq_artifacts_experiment_filename',
+        'artifacts',
+        ['experiment_id', 'filename']
+    )
+
+
+def downgrade() -> None:
+    op.drop_constraint('uq_artifacts_experiment_filename', 'artifacts', type_='unique')
+    op.drop_index('ix_artifacts_content_hash', table_name='artifacts')
+    op.drop_column('artifacts', 'content_hash')
@@ -0,0 +1,28 @@
+"""Generate experiment and artifact ids in the database
+
+gen_random_uuid() is built in from PostgreSQL 13; pgcrypto provides it on
+older servers. On PostgreSQL 18+ the defaults can be switched to uuidv7()
+for time-ordered keys and better primary-key index locality.
+"""
+from alembic import op
+import sqlalchemy as sa
+
+# revision identifiers
+revision = '006'
+down_revision = '005'
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    # Creating an extension needs extra privileges, so only ask where it is required
+    server_version = op.get_bind().execute(sa.text("SHOW server_version_num")).scalar()
+    if int(server_version) < 130000:
+        op.execute("CREATE EXTENSION IF NOT EXISTS pgcrypto")
+    op.execute("ALTER TABLE experiments ALTER COLUMN id SET DEFAULT gen_random_uuid()")
+    op.execute("ALTER TABLE artifacts ALTER COLUMN id SET DEFAULT gen_random_uuid()")
+
+
+def downgrade() -> None:
+    op.execute("ALTER TABLE artifacts ALTER COLUMN id DROP DEFAULT")
+    op.execute("ALTER TABLE experiments ALTER COLUMN id DROP DEFAULT")
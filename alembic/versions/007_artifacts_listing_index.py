@@ -0,0 +1,26 @@
+"""Add index for listing an experiment's artifacts newest first
+
+Lets list_artifacts read rows already in uploaded_at DESC order instead
+of sorting every artifact of the experiment before applying the limit.
+"""
+from alembic import op
+import sqlalchemy as sa
+
+# revision identifiers
+revision = '007'
+down_revision = '006'
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    op.create_index(
+        'ix_artifacts_exp_uploaded',
+        'artifacts',
+        ['experiment_id', sa.text('uploaded_at DESC')]
+    )
+    op.execute("ANALYZE artifacts")
+
+
+def downgrade() -> None:
+    op.drop_index('ix_artifacts_exp_uploaded', table_name='artifacts')
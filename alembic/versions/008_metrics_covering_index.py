@@ -0,0 +1,39 @@
+"""Cover metric values in the per-metric index and index step order
+
+Adding value as an INCLUDE column to (experiment_id, metric_name, step)
+lets the summary and filtered history reads run as index-only scans.
+(experiment_id, step) serves unfiltered history ordered by step.
+"""
+from alembic import op
+
+# revision identifiers
+revision = '008'
+down_revision = '007'
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    op.drop_index('ix_metrics_exp_name_step', table_name='metrics')
+    op.create_index(
+        'ix_metrics_exp_name_step',
+        'metrics',
+        ['experiment_id', 'metric_name', 'step'],
+        postgresql_include=['value']
+    )
+    op.create_index(
+        'ix_metrics_exp_step',
+        'metrics',
+        ['experiment_id', 'step']
+    )
+    op.execute("ANALYZE metrics")
+
+
+def downgrade() -> None:
+    op.drop_index('ix_metrics_exp_step', table_name='metrics')
+    op.drop_index('ix_metrics_exp_name_step', table_name='metrics')
+    op.create_index(
+        'ix_metrics_exp_name_step',
+        'metrics',
+        ['experiment_id', 'metric_name', 'step']
+    )
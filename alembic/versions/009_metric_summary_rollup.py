@@ -0,0 +1,58 @@
+"""Add metric_summary rollup table
+
+Holds running min/max/sum/count and the latest value per
+(experiment_id, metric_name) so the summary endpoint reads one row per
+metric instead of aggregating the metrics table. Existing metrics are
+backfilled.
+"""
+from alembic import op
+import sqlalchemy as sa
+from sqlalchemy.dialects import postgresql
+
+# revision identifiers
+revision = '009'
+down_revision = '008'
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    op.create_table(
+        'metric_summary',
+        sa.Column('experiment_id', postgresql.UUID(as_uuid=True), nullable=False),
+        sa.Column('metric_name', sa.String(length=100), nullable=False),
+        sa.Column('min_value', sa.Float(), nullable=False),
+        sa.Column('max_value', sa.Float(), nullable=False),
+        sa.Column('sum_value', sa.Float(), nullable=False),
+        sa.Column('count', sa.Integer(), nullable=False),
+        sa.Column('latest_step', sa.Integer(), nullable=False),
+        sa.Column('latest_value', sa.Float(), nullable=False),
+        sa.ForeignKeyConstraint(['experiment_id'], ['experiments.id'], ondelete='CASCADE'),
+        sa.PrimaryKeyConstraint('experiment_id', 'metric_name')
+    )
+    
+    op.execute("""
+        INSERT INTO metric_summary (
+            experiment_id, metric_name, min_value, max_value, sum_value,
+            count, latest_step, latest_value
+        )
+        SELECT agg.experiment_id, agg.metric_name, agg.min_value, agg.max_value,
+               agg.sum_value, agg.count, latest.step, latest.value
+        FROM (
+            SELECT experiment_id, metric_name, min(value) AS min_value,
+                   max(value) AS max_value, sum(value) AS sum_value,
+                   count(*) AS count
+            FROM metrics
+            GROUP BY experiment_id, metric_name
+        ) agg
+        JOIN (
+            SELECT DISTINCT ON (experiment_id, metric_name)
+                   experiment_id, metric_name, step, value
+            FROM metrics
+            ORDER BY experiment_id, metric_name, step DESC
+        ) latest USING (experiment_id, metric_name)
+    """)
+
+
+def downgrade() -> None:
+    op.drop_table('metric_summary')
@@ -0,0 +1,34 @@
+"""Store metric values as single precision
+
+Metric values carry far fewer significant digits than double precision
+holds. REAL halves the width of every row the history and index scans
+read.
+"""
+from alembic import op
+import sqlalchemy as sa
+
+# revision identifiers
+revision = '010'
+down_revision = '009'
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    op.alter_column(
+        'metrics',
+        'value',
+        type_=sa.Float(precision=24),
+        existing_type=sa.Float(),
+        existing_nullable=False
+    )
+
+
+def downgrade() -> None:
+    op.alter_column(
+        'metrics',
+        'value',
+        type_=sa.Float(),
+        existing_type=sa.Float(precision=24),
+        existing_nullable=False
+    )
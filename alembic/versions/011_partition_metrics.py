@@ -0,0 +1,105 @@
+"""Hash-partition metrics by experiment_id
+
+Every metric query filters on one experiment, so with 16 hash partitions
+each read prunes to a single partition's heap and indexes. PostgreSQL
+requires the partition key in the primary key, which becomes
+(experiment_id, id); ids still come from the same sequence and stay
+unique. Existing rows are copied into the new table.
+"""
+from alembic import op
+
+# revision identifiers
+revision = '011'
+down_revision = '010'
+branch_labels = None
+depends_on = None
+
+PARTITIONS = 16
+
+COLUMNS = "id, experiment_id, step, metric_name, value, timestamp"
+
+
+def _create_indexes() -> None:
+    # Created on the parent; PostgreSQL builds a matching index per partition
+    op.execute(
+        "CREATE INDEX ix_metrics_exp_name_step ON metrics "
+        "(experiment_id, metric_name, step) INCLUDE (value)"
+    )
+    op.execute("CREATE INDEX ix_metrics_exp_timestamp ON metrics (experiment_id, timestamp)")
+    op.execute("CREATE INDEX ix_metrics_exp_step ON metrics (experiment_id, step)")
+
+
+def _drop_indexes() -> None:
+    op.execute("DROP INDEX ix_metrics_exp_step")
+    op.execute("DROP INDEX ix_metrics_exp_timestamp")
+    op.execute("DROP INDEX ix_metrics_exp_name_step")
+
+
+def upgrade() -> None:
+    op.execute("ALTER TABLE metrics RENAME TO metrics_unpartitioned")
+    # Free the metrics_pkey name for the new table
+    op.execute(
+        "ALTER TABLE metrics_unpartitioned "
+        "RENAME CONSTRAINT metrics_pkey TO metrics_unpartitioned_pkey"
+    )
+    _drop_indexes()
+    
+    op.execute("""
+        CREATE TABLE metrics (
+            id integer NOT NULL DEFAULT nextval('metrics_id_seq'),
+            experiment_id uuid NOT NULL
+                REFERENCES experiments (id) ON DELETE CASCADE,
+            step integer NOT NULL,
+            metric_name varchar(100) NOT NULL,
+            value real NOT NULL,
+            timestamp timestamp without time zone NOT NULL,
+            PRIMARY KEY (experiment_id, id)
+        ) PARTITION BY HASH (experiment_id)
+    """)
+    for remainder in range(PARTITIONS):
+        op.execute(
+            f"CREATE TABLE metrics_p{remainder} PARTITION OF metrics "
+            f"FOR VALUES WITH (MODULUS {PARTITIONS}, REMAINDER {remainder})"
+        )
+    
+    op.execute(
+        f"INSERT INTO metrics ({COLUMNS}) "
+        f"SELECT {COLUMNS} FROM metrics_unpartitioned"
+    )
+    # Keep the sequence when the old table is dropped
+    op.execute("ALTER SEQUENCE metrics_id_seq OWNED BY metrics.id")
+    op.execute("DROP TABLE metrics_unpartitioned")
+    
+    _create_indexes()
+    op.execute("ANALYZE metrics")
+
+
+def downgrade() -> None:
+    op.execute("ALTER TABLE metrics RENAME TO metrics_partitioned")
+    op.execute(
+        "ALTER TABLE metrics_partitioned "
+        "RENAME CONSTRAINT metrics_pkey TO metrics_partitioned_pkey"
+    )
+    _drop_indexes()
+    
+    op.execute("""
+        CREATE TABLE metrics (
+            id integer NOT NULL DEFAULT nextval('metrics_id_seq') PRIMARY KEY,
+            experiment_id uuid NOT NULL
+                REFERENCES experiments (id) ON DELETE CASCADE,
+            step integer NOT NULL,
+            metric_name varchar(100) NOT NULL,
+            value real NOT NULL,
+            timestamp timestamp without time zone NOT NULL
+        )
+    """)
+    op.execute(
+        f"INSERT INTO metrics ({COLUMNS}) "
+        f"SELECT {COLUMNS} FROM metrics_partitioned"
+    )
+    op.execute("ALTER SEQUENCE metrics_id_seq OWNED BY metrics.id")
+    # Dropping the parent drops every partition
+    op.execute("DROP TABLE metrics_partitioned")
+    
+    _create_indexes()
+    op.execute("ANALYZE metrics")
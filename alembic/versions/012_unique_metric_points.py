@@ -0,0 +1,69 @@
+"""Make (experiment_id, metric_name, step) unique in metrics
+
+Inserts use the index as their ON CONFLICT target, so a retried batch no
+longer stores duplicate points. Existing duplicates are removed first,
+keeping the most recently inserted row of each, and metric_summary is
+rebuilt from what remains.
+"""
+from alembic import op
+
+# revision identifiers
+revision = '012'
+down_revision = '011'
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    op.execute("""
+        DELETE FROM metrics m
+        USING metrics newer
+        WHERE newer.experiment_id = m.experiment_id
+          AND newer.metric_name = m.metric_name
+          AND newer.step = m.step
+          AND newer.id > m.id
+    """)
+    
+    op.drop_index('ix_metrics_exp_name_step', table_name='metrics')
+    op.create_index(
+        'ix_metrics_exp_name_step',
+        'metrics',
+        ['experiment_id', 'metric_name', 'step'],
+        unique=True,
+        postgresql_include=['value']
+    )
+    
+    # Aggregates counted the removed duplicates; recompute them
+    op.execute("DELETE FROM metric_summary")
+    op.execute("""
+        INSERT INTO metric_summary (
+            experiment_id, metric_name, min_value, max_value, sum_value,
+            count, latest_step, latest_value
+        )
+        SELECT agg.experiment_id, agg.metric_name, agg.min_value, agg.max_value,
+               agg.sum_value, agg.count, latest.step, latest.value
+        FROM (
+            SELECT experiment_id, metric_name, min(value) AS min_value,
+                   max(value) AS max_value, sum(value) AS sum_value,
+                   count(*) AS count
+            FROM metrics
+            GROUP BY experiment_id, metric_name
+        ) agg
+        JOIN (
+            SELECT DISTINCT ON (experiment_id, metric_name)
+                   experiment_id, metric_name, step, value
+            FROM metrics
+            ORDER BY experiment_id, metric_name, step DESC
+        ) latest USING (experiment_id, metric_name)
+    """)
+    op.execute("ANALYZE metrics")
+
+
+def downgrade() -> None:
+    op.drop_index('ix_metrics_exp_name_step', table_name='metrics')
+    op.create_index(
+        'ix_metrics_exp_name_step',
+        'metrics',
+        ['experiment_id', 'metric_name', 'step'],
+        postgresql_include=['value']
+    )
@@ -0,0 +1,32 @@
+"""Add id to the artifact listing index for keyset pagination
+
+Cursor pages filter on (uploaded_at, id) < (:uploaded_at, :id) and order
+by both columns, so the index needs id as a tiebreaker to seek directly
+to the cursor.
+"""
+from alembic import op
+import sqlalchemy as sa
+
+# revision identifiers
+revision = '013'
+down_revision = '012'
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    op.drop_index('ix_artifacts_exp_uploaded', table_name='artifacts')
+    op.create_index(
+        'ix_artifacts_exp_uploaded',
+        'artifacts',
+        ['experiment_id', sa.text('uploaded_at DESC'), sa.text('id DESC')]
+    )
+
+
+def downgrade() -> None:
+    op.drop_index('ix_artifacts_exp_uploaded', table_name='artifacts')
+    op.create_index(
+        'ix_artifacts_exp_uploaded',
+        'artifacts',
+        ['experiment_id', sa.text('uploaded_at DESC')]
+    )
@@ -1,14 +1,31 @@
 from sqlalchemy import create_engine
+from sqlalchemy.engine import make_url
 from sqlalchemy.ext.declarative import declarative_base
 from sqlalchemy.orm import sessionmaker
-from app.config import get_settings
+from app.config import SETTINGS
 
-settings = get_settings()
+# psycopg2 only: batch executemany UPDATE/DELETE with execute_batch as well;
+# INSERTs are already batched by insertmanyvalues below
+_dialect_options = {}
+if make_url(SETTINGS.DATABASE_URL).get_driver_name() == "psycopg2":
+    _dialect_options = {
+        "executemany_mode": "values_plus_batch",
+        "executemany_batch_page_size": 500,
+    }
 
 engine = create_engine(
-    settings.DATABASE_URL,
+    SETTINGS.DATABASE_URL,
+    pool_size=SETTINGS.POOL_SIZE,
+    max_overflow=SETTINGS.MAX_OVERFLOW,
+    pool_timeout=SETTINGS.POOL_TIMEOUT,
+    pool_recycle=SETTINGS.POOL_RECYCLE,
     pool_pre_ping=True,
-    echo=True  # Set to False in production
+    # Rows per multi-VALUES INSERT when executemany inserts are batched
+    insertmanyvalues_page_size=1000,
+    # Room for every distinct statement shape the services emit
+    query_cache_size=1200,
+    echo=True,  # Set to False in production
+    **_dialect_options
 )
 
 SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
@@ -1,25 +1,61 @@
-from fastapi import FastAPI
+from fastapi import FastAPI, Request
+from fastapi.encoders import jsonable_encoder
+from fastapi.exceptions import RequestValidationError
 from fastapi.middleware.cors import CORSMiddleware
-from app.config import get_settings
+from fastapi.middleware.gzip import GZipMiddleware
+from fastapi.responses import ORJSONResponse
+from app.config import SETTINGS
 from app.routers import experiments_router, metrics_router, artifacts_router
 
-settings = get_settings()
+
+class JSONGZipMiddleware(GZipMiddleware):
+    """Gzip API responses, but pass artifact routes through untouched.
+    
+    Artifact files are binary and often already compressed, so gzipping
+    them only burns CPU.
+    """
+    
+    async def __call__(self, scope, receive, send):
+        if scope["type"] == "http" and scope["path"].startswith("/artifacts"):
+            await self.app(scope, receive, send)
+            return
+        await super().__call__(scope, receive, send)
+
 
 app = FastAPI(
     title="ML Experiment Tracking Platform",
     description="A simple API for tracking machine learning experiments",
-    version="1.0.0"
+    version="1.0.0",
+    default_response_class=ORJSONResponse
 )
 
+
+@app.exception_handler(RequestValidationError)
+async def validation_exception_handler(request: Request, exc: RequestValidationError):
+    """422 with the same body as FastAPI's default handler.
+    
+    The default renders with json.dumps(allow_nan=False), which raises on
+    the NaN/Infinity inputs echoed back in the errors; orjson writes null.
+    """
+    return ORJSONResponse(
+        status_code=422,
+        content={"detail": jsonable_encoder(exc.errors())}
+    )
+
+
 # CORS middleware
 app.add_middleware(
     CORSMiddleware,
-    allow_origins=settings.CORS_ORIGINS,
+    allow_origins=SETTINGS.CORS_ORIGINS,
     allow_credentials=True,
     allow_methods=["*"],
     allow_headers=["*"],
+    expose_headers=["X-Total-Count", "X-Next-Cursor"],
 )
 
+# Compress JSON responses; numeric metric histories shrink several times over
+app.add_middleware(JSONGZipMiddleware, minimum_size=1024, compresslevel=4)
+
 # Include routers
 app.include_router(experiments_router)
 app.include_router(metrics_router)
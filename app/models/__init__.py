@@ -1,5 +1,6 @@
 from app.models.experiment import Experiment
 from app.models.metric import Metric
+from app.models.metric_summary import MetricSummary
 from app.models.artifact import Artifact
 
-__all__ = ["Experiment", "Metric", "Artifact"]
+__all__ = ["Experiment", "Metric", "MetricSummary", "Artifact"]
@@ -1,5 +1,4 @@
-from sqlalchemy import Column, String, Integer, DateTime, ForeignKey
-from sqlalchemy.dialects.postgresql import UUID
+from sqlalchemy import Column, String, Integer, DateTime, ForeignKey, UniqueConstraint, Index, Uuid, func
 from sqlalchemy.orm import relationship
 from datetime import datetime
 import uuid
@@ -10,12 +9,25 @@ from app.database import Base
 class Artifact(Base):
     __tablename__ = "artifacts"
     
-    id = Column(UUID(as_uuid=True), primary_key=True, default=uuid.uuid4)
-    experiment_id = Column(UUID(as_uuid=True), ForeignKey("experiments.id", ondelete="CASCADE"), nullable=False)
+    # Ids come from uuid4 here; the server default covers rows inserted outside the ORM
+    id = Column(Uuid(as_uuid=True), primary_key=True, default=uuid.uuid4, server_default=func.gen_random_uuid())
+    experiment_id = Column(Uuid(as_uuid=True), ForeignKey("experiments.id", ondelete="CASCADE"), nullable=False)
     filename = Column(String(255), nullable=False)
     filepath = Column(String(500), nullable=False)
     size_bytes = Column(Integer, nullable=False)
+    content_hash = Column(String(64), nullable=True, index=True)  # SHA-256 of the stored content
     uploaded_at = Column(DateTime, default=datetime.utcnow, nullable=False)
     
     # Relationship
     experiment = relationship("Experiment", back_populates="artifacts")
+    
+    __table_args__ = (
+        UniqueConstraint("experiment_id", "filename", name="uq_artifacts_experiment_filename"),
+        # Matches list_artifacts: filter by experiment, newest first, id breaking ties
+        Index(
+            "ix_artifacts_exp_uploaded",
+            experiment_id,
+            uploaded_at.desc(),
+            id.desc()
+        ),
+    )
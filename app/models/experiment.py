@@ -1,5 +1,5 @@
-from sqlalchemy import Column, String, DateTime, JSON
-from sqlalchemy.dialects.postgresql import UUID
+from sqlalchemy import Column, String, DateTime, JSON, Index, Uuid, func
+from sqlalchemy.dialects.postgresql import JSONB
 from sqlalchemy.orm import relationship
 from datetime import datetime
 import uuid
@@ -10,13 +10,23 @@ from app.database import Base
 class Experiment(Base):
     __tablename__ = "experiments"
     
-    id = Column(UUID(as_uuid=True), primary_key=True, default=uuid.uuid4)
+    # Ids come from uuid4 here; the server default covers rows inserted outside the ORM
+    id = Column(Uuid(as_uuid=True), primary_key=True, default=uuid.uuid4, server_default=func.gen_random_uuid())
     name = Column(String(200), nullable=False)
     status = Column(String(50), nullable=False, default="running")
     hyperparameters = Column(JSON, nullable=True)
-    tags = Column(JSON, nullable=True, default=list)  # Store tags as JSON array
+    tags = Column(JSON().with_variant(JSONB(), "postgresql"), nullable=True, default=list)  # Store tags as JSONB array
     created_at = Column(DateTime, default=datetime.utcnow, nullable=False)
     
-    # Relationships
-    metrics = relationship("Metric", back_populates="experiment", cascade="all, delete-orphan")
-    artifacts = relationship("Artifact", back_populates="experiment", cascade="all, delete-orphan")
+    # Relationships; children are removed by ON DELETE CASCADE rather than loaded and deleted one by one
+    metrics = relationship("Metric", back_populates="experiment", cascade="all, delete-orphan", passive_deletes=True)
+    artifacts = relationship("Artifact", back_populates="experiment", cascade="all, delete-orphan", passive_deletes=True)
+    
+    __table_args__ = (
+        Index(
+            "ix_experiments_tags_gin",
+            "tags",
+            postgresql_using="gin",
+            postgresql_ops={"tags": "jsonb_path_ops"}
+        ),
+    )
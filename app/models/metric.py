@@ -1,5 +1,4 @@
-from sqlalchemy import Column, Integer, String, Float, DateTime, ForeignKey
-from sqlalchemy.dialects.postgresql import UUID
+from sqlalchemy import Column, Integer, String, Float, DateTime, ForeignKey, Index, Uuid
 from sqlalchemy.orm import relationship
 from datetime import datetime
 
@@ -9,12 +8,26 @@ from app.database import Base
 class Metric(Base):
     __tablename__ = "metrics"
     
+    # On PostgreSQL the table is hash-partitioned by experiment_id and its
+    # primary key is (experiment_id, id); id alone is still unique
     id = Column(Integer, primary_key=True, autoincrement=True)
-    experiment_id = Column(UUID(as_uuid=True), ForeignKey("experiments.id", ondelete="CASCADE"), nullable=False)
+    experiment_id = Column(Uuid(as_uuid=True), ForeignKey("experiments.id", ondelete="CASCADE"), nullable=False)
     step = Column(Integer, nullable=False)
     metric_name = Column(String(100), nullable=False)
-    value = Column(Float, nullable=False)
+    value = Column(Float(precision=24), nullable=False)  # REAL on PostgreSQL
     timestamp = Column(DateTime, default=datetime.utcnow, nullable=False)
     
     # Relationship
     experiment = relationship("Experiment", back_populates="metrics")
+    
+    __table_args__ = (
+        # One value per (metric, step); also the conflict target for inserts
+        Index(
+            "ix_metrics_exp_name_step",
+            "experiment_id", "metric_name", "step",
+            unique=True,
+            postgresql_include=["value"]
+        ),
+        Index("ix_metrics_exp_step", "experiment_id", "step"),
+        Index("ix_metrics_exp_timestamp", "experiment_id", "timestamp"),
+    )
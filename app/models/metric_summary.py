@@ -0,0 +1,17 @@
+from sqlalchemy import Column, Integer, String, Float, ForeignKey, Uuid
+
+from app.database import Base
+
+
+class MetricSummary(Base):
+    """Running per-metric aggregates, updated in the same transaction as inserts"""
+    __tablename__ = "metric_summary"
+    
+    experiment_id = Column(Uuid(as_uuid=True), ForeignKey("experiments.id", ondelete="CASCADE"), primary_key=True)
+    metric_name = Column(String(100), primary_key=True)
+    min_value = Column(Float, nullable=False)
+    max_value = Column(Float, nullable=False)
+    sum_value = Column(Float, nullable=False)
+    count = Column(Integer, nullable=False)
+    latest_step = Column(Integer, nullable=False)
+    latest_value = Column(Float, nullable=False)
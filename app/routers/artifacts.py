@@ -1,36 +1,60 @@
-from fastapi import APIRouter, Depends, HTTPException, UploadFile, File, status
+from fastapi import APIRouter, Depends, HTTPException, Query, Request, Response, status
 from fastapi.responses import FileResponse
 from sqlalchemy.orm import Session
-from typing import List
+from typing import List, Optional
 from uuid import UUID
 from pathlib import Path
 
 from app.database import get_db
-from app.services.artifact_service import ArtifactService
+from app.services.artifact_service import ArtifactService, MultipartUpload
 from app.schemas.artifact import ArtifactResponse
-from app.config import get_settings
+from app.config import SETTINGS
 
-settings = get_settings()
+# Resolved once at import instead of converting the setting per request
+ARTIFACTS_DIR = Path(SETTINGS.ARTIFACTS_PATH).resolve()
 
 router = APIRouter(prefix="/artifacts", tags=["artifacts"])
 
+# The upload body is parsed by hand, so describe it for the OpenAPI docs
+UPLOAD_REQUEST_BODY = {
+    "requestBody": {
+        "required": True,
+        "content": {
+            "multipart/form-data": {
+                "schema": {
+                    "type": "object",
+                    "required": ["file"],
+                    "properties": {"file": {"type": "string", "format": "binary"}}
+                }
+            }
+        }
+    }
+}
+
 
 @router.post(
     "/experiments/{experiment_id}/upload",
     response_model=ArtifactResponse,
-    status_code=status.HTTP_201_CREATED
+    status_code=status.HTTP_201_CREATED,
+    openapi_extra=UPLOAD_REQUEST_BODY
 )
 async def upload_artifact(
     experiment_id: UUID,
-    file: UploadFile = File(...),
+    request: Request,
     db: Session = Depends(get_db)
 ):
-    """Upload a file artifact for an experiment."""
+    """Upload a file artifact for an experiment.
+    
+    The `file` part is streamed to disk as it arrives rather than spooled
+    into a temporary file first.
+    """
+    upload = MultipartUpload(request)
     artifact = await ArtifactService.save_artifact(
         db=db,
         experiment_id=experiment_id,
-        file=file,
-        artifacts_path=settings.ARTIFACTS_PATH
+        filename=await upload.filename(),
+        chunks=upload.chunks(),
+        artifacts_dir=ARTIFACTS_DIR
     )
     return artifact
 
@@ -38,26 +62,40 @@ async def upload_artifact(
 @router.get("/experiments/{experiment_id}", response_model=List[ArtifactResponse])
 def list_artifacts(
     experiment_id: UUID,
-    skip: int = 0,
+    response: Response,
+    after: Optional[str] = Query(None, description="Cursor from the X-Next-Cursor header of the previous page"),
+    skip: int = Query(0, ge=0, deprecated=True, description="Offset pagination; prefer after"),
     limit: int = 100,
     db: Session = Depends(get_db)
 ):
-    """List all artifacts for an experiment."""
+    """List all artifacts for an experiment, newest first.
+    
+    Page with `after`: each full page sets `X-Next-Cursor`, which is
+    `<uploaded_at>_<id>` of its last artifact.
+    """
     artifacts = ArtifactService.list_artifacts(
         db=db,
         experiment_id=experiment_id,
         skip=skip,
-        limit=limit
+        limit=limit,
+        after=ArtifactService.parse_cursor(after) if after else None
     )
+    if artifacts and len(artifacts) == limit:
+        response.headers["X-Next-Cursor"] = ArtifactService.cursor(artifacts[-1])
     return artifacts
 
 
 @router.get("/{artifact_id}/download")
-async def download_artifact(
+def download_artifact(
     artifact_id: UUID,
+    request: Request,
     db: Session = Depends(get_db)
 ):
-    """Download an artifact file."""
+    """Download an artifact file.
+    
+    Content-addressed artifacts carry their SHA-256 as a strong ETag, so
+    conditional requests with a matching If-None-Match get a 304.
+    """
     artifact = ArtifactService.get_artifact(db=db, artifact_id=artifact_id)
     if not artifact:
         raise HTTPException(
@@ -65,8 +103,18 @@ async def download_artifact(
             detail=f"Artifact {artifact_id} not found"
         )
     
+    headers = {"Cache-Control": "private, max-age=3600"}
+    if artifact.content_hash:
+        etag = f'"{artifact.content_hash}"'
+        headers["ETag"] = etag
+        if request.headers.get("if-none-match") == etag:
+            return Response(status_code=status.HTTP_304_NOT_MODIFIED, headers=headers)
+    
     file_path = Path(artifact.filepath)
-    if not file_path.exists():
+    # Stat once and hand the result to FileResponse so it doesn't stat again
+    try:
+        stat_result = file_path.stat()
+    except FileNotFoundError:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND,
             detail="Artifact file not found on disk"
@@ -75,7 +123,9 @@ async def download_artifact(
     return FileResponse(
         path=str(file_path),
         filename=artifact.filename,
-        media_type="application/octet-stream"
+        stat_result=stat_result,
+        media_type=ArtifactService.content_type(artifact.filename),
+        headers=headers
     )
 
 
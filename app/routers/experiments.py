@@ -1,4 +1,4 @@
-from fastapi import APIRouter, Depends, HTTPException, Query
+from fastapi import APIRouter, Depends, HTTPException, Query, Response
 from sqlalchemy.orm import Session
 from typing import List
 from uuid import UUID
@@ -8,7 +8,8 @@ from app.schemas.experiment import (
     ExperimentCreate,
     ExperimentResponse,
     StatusUpdate,
-    TagsUpdate
+    TagsUpdate,
+    STATUS_PATTERN
 )
 from app.services.experiment_service import ExperimentService
 
@@ -32,23 +33,32 @@ def create_experiment(
 
 @router.get("", response_model=List[ExperimentResponse])
 def list_experiments(
+    response: Response,
     page: int = Query(default=1, ge=1, description="Page number"),
     size: int = Query(default=50, ge=1, le=100, description="Page size"),
     status: str = Query(
         default=None,
-        pattern="^(running|completed|failed)$",
+        pattern=STATUS_PATTERN,
         description="Filter by status"
     ),
+    tag: str = Query(default=None, description="Filter by tag"),
     db: Session = Depends(get_db)
 ):
     """
-    List experiments with pagination and optional status filter.
+    List experiments with pagination and optional status/tag filters.
     
     - **page**: Page number (default: 1)
     - **size**: Items per page (default: 50, max: 100)
     - **status**: Filter by status (optional: running, completed, failed)
+    - **tag**: Only return experiments carrying this tag (optional)
+    
+    The total number of matching experiments is returned in the
+    `X-Total-Count` header; on large tables it is an estimate.
     """
-    return ExperimentService.get_experiments(db, page, size, status)
+    response.headers["X-Total-Count"] = str(
+        ExperimentService.count_experiments(db, status, tag)
+    )
+    return ExperimentService.get_experiments(db, page, size, status, tag)
 
 
 @router.get("/compare", response_model=List[ExperimentResponse])
@@ -59,13 +69,21 @@ def compare_experiments(
     """
     Compare multiple experiments by their IDs.
     
-    - **ids**: Comma-separated list of experiment UUIDs
+    - **ids**: Comma-separated list of experiment UUIDs (max 100)
     
-    Returns list of experiments with their hyperparameters.
+    Returns list of experiments with their hyperparameters, in the order
+    the IDs were given.
     """
+    raw_ids = ids.split(",")
+    if len(raw_ids) > ExperimentService.MAX_COMPARE_IDS:
+        raise HTTPException(
+            status_code=400,
+            detail=f"At most {ExperimentService.MAX_COMPARE_IDS} experiments can be compared"
+        )
+    
     try:
         # Parse comma-separated UUIDs
-        experiment_ids = [UUID(id.strip()) for id in ids.split(",")]
+        experiment_ids = [UUID(id.strip()) for id in raw_ids]
     except ValueError:
         raise HTTPException(
             status_code=400,
@@ -1,4 +1,5 @@
 from fastapi import APIRouter, Depends, HTTPException, Query, Body
+from fastapi.responses import ORJSONResponse, StreamingResponse
 from sqlalchemy.orm import Session
 from typing import List, Union
 from uuid import UUID
@@ -8,6 +9,7 @@ from app.schemas.metric import (
     MetricCreate,
     MetricBatchCreate,
     MetricResponse,
+    MetricColumns,
     MetricLogResponse,
     MetricSummary
 )
@@ -29,25 +31,23 @@ def log_metrics(
     - **Single metric**: Pass MetricCreate object
     - **Batch metrics**: Pass MetricBatchCreate with list of metrics (max 1000)
     
-    Uses efficient bulk insert for batches.
-    Returns count of metrics logged.
+    Uses efficient bulk insert for batches. Points whose (metric_name, step)
+    was already logged are skipped, so retrying a request is safe.
+    Returns count of new metrics stored.
     """
-    # Verify experiment exists
-    experiment = ExperimentService.get_experiment(db, experiment_id)
-    if not experiment:
-        raise HTTPException(
-            status_code=404,
-            detail=f"Experiment with id {experiment_id} not found"
-        )
-    
     # Handle single or batch metrics
     if isinstance(data, MetricBatchCreate):
         metrics = data.metrics
     else:
         metrics = [data]
     
-    # Bulk insert
+    # Bulk insert; the experiment check happens in the same transaction
     count = MetricService.log_metrics_bulk(db, experiment_id, metrics)
+    if count is None:
+        raise HTTPException(
+            status_code=404,
+            detail=f"Experiment with id {experiment_id} not found"
+        )
     
     return MetricLogResponse(
         count=count,
@@ -84,7 +84,65 @@ def get_experiment_metrics(
         db, experiment_id, metric_name, limit, offset
     )
     
-    return metrics
+    # Rows are already in response shape (UUIDs and datetimes are handled by
+    # orjson); returning a response directly skips per-row model validation
+    return ORJSONResponse([dict(row) for row in metrics])
+
+
+@router.get("/{experiment_id}/metrics/columns", response_model=MetricColumns)
+def get_experiment_metric_columns(
+    experiment_id: UUID,
+    metric_name: str = Query(None, description="Filter by metric name"),
+    limit: int = Query(1000, ge=1, le=10000, description="Maximum number of results"),
+    offset: int = Query(0, ge=0, description="Number of results to skip"),
+    db: Session = Depends(get_db)
+):
+    """
+    Get metrics for an experiment in columnar form.
+    
+    Same filtering and pagination as the list endpoint, but returned as
+    parallel `step`, `metric_name` and `value` arrays ordered by step.
+    Cheaper to serialize, compress and parse for charting.
+    """
+    # Verify experiment exists
+    experiment = ExperimentService.get_experiment(db, experiment_id)
+    if not experiment:
+        raise HTTPException(
+            status_code=404,
+            detail=f"Experiment with id {experiment_id} not found"
+        )
+    
+    return ORJSONResponse(
+        MetricService.get_metric_columns(db, experiment_id, metric_name, limit, offset)
+    )
+
+
+@router.get("/{experiment_id}/metrics/stream")
+def stream_experiment_metrics(
+    experiment_id: UUID,
+    metric_name: str = Query(None, description="Filter by metric name"),
+    db: Session = Depends(get_db)
+):
+    """
+    Stream the full metric history of an experiment as ND-JSON.
+    
+    - **metric_name**: Optional filter by specific metric name
+    
+    One JSON object per line, ordered by step. Unlike the paginated
+    endpoint there is no limit; rows are sent as they are read.
+    """
+    # Verify experiment exists
+    experiment = ExperimentService.get_experiment(db, experiment_id)
+    if not experiment:
+        raise HTTPException(
+            status_code=404,
+            detail=f"Experiment with id {experiment_id} not found"
+        )
+    
+    return StreamingResponse(
+        MetricService.stream_metrics(db, experiment_id, metric_name),
+        media_type="application/x-ndjson"
+    )
 
 
 @router.get("/{experiment_id}/metrics/summary", response_model=List[MetricSummary])
@@ -102,7 +160,7 @@ def get_metrics_summary(
     - **latest**: Most recent value (by step)
     - **count**: Number of data points
     
-    Uses SQL GROUP BY for efficient aggregation.
+    Served from a rollup table maintained as metrics are logged.
     """
     # Verify experiment exists
     experiment = ExperimentService.get_experiment(db, experiment_id)
@@ -1,6 +1,7 @@
 from pydantic import BaseModel, Field
 from datetime import datetime
 from uuid import UUID
+from typing import Optional
 
 
 class ArtifactResponse(BaseModel):
@@ -9,6 +10,7 @@ class ArtifactResponse(BaseModel):
     filename: str
     filepath: str
     size_bytes: int
+    content_hash: Optional[str] = None
     uploaded_at: datetime
     
     class Config:
@@ -3,6 +3,9 @@ from datetime import datetime
 from uuid import UUID
 from typing import Optional, List
 
+# Allowed experiment status values, shared by schemas and query parameters
+STATUS_PATTERN = "^(running|completed|failed)$"
+
 
 class ExperimentCreate(BaseModel):
     name: str = Field(..., max_length=200)
@@ -23,7 +26,7 @@ class ExperimentResponse(BaseModel):
 
 
 class StatusUpdate(BaseModel):
-    status: str = Field(..., pattern="^(running|completed|failed)$")
+    status: str = Field(..., pattern=STATUS_PATTERN)
 
 
 class TagsUpdate(BaseModel):
@@ -33,4 +36,4 @@ class TagsUpdate(BaseModel):
 class ExperimentQuery(BaseModel):
     page: int = Field(default=1, ge=1)
     size: int = Field(default=50, ge=1, le=100)
-    status: Optional[str] = Field(None, pattern="^(running|completed|failed)$")
+    status: Optional[str] = Field(None, pattern=STATUS_PATTERN)
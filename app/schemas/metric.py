@@ -2,19 +2,27 @@ from pydantic import BaseModel, Field, field_validator
 from datetime import datetime
 from uuid import UUID
 from typing import List
-import math
+
+# Largest finite single-precision value
+FLOAT32_MAX = 3.4028234663852886e38
+# Smallest normal single-precision magnitude; PostgreSQL reports underflow below it
+FLOAT32_MIN = 1.1754943508222875e-38
 
 
 class MetricCreate(BaseModel):
     step: int = Field(..., ge=0)
     metric_name: str = Field(..., max_length=100)
-    value: float
+    # NaN/infinity and overflow are rejected inside pydantic-core, without a
+    # Python call per item of a batch. Values are stored as REAL, so they
+    # must also fit in single precision; only underflow needs the validator.
+    value: float = Field(..., allow_inf_nan=False, ge=-FLOAT32_MAX, le=FLOAT32_MAX)
     
-    @field_validator('value')
+    @field_validator("value")
     @classmethod
-    def validate_value(cls, v: float) -> float:
-        if math.isnan(v) or math.isinf(v):
-            raise ValueError("Value must not be NaN or infinity")
+    def value_not_underflowing(cls, v: float) -> float:
+        # Nonzero values too small for single precision fail on insert instead
+        if v != 0.0 and abs(v) < FLOAT32_MIN:
+            raise ValueError(f"magnitude must be 0 or at least {FLOAT32_MIN}")
         return v
 
 
@@ -34,6 +42,13 @@ class MetricResponse(BaseModel):
         from_attributes = True
 
 
+class MetricColumns(BaseModel):
+    """Metric history as parallel arrays; index i of each list is one point"""
+    step: List[int]
+    metric_name: List[str]
+    value: List[float]
+
+
 class MetricLogResponse(BaseModel):
     count: int
     message: str
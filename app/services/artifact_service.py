@@ -1,18 +1,155 @@
 import os
 import re
+import fcntl
+import hashlib
+import mimetypes
+import aiofiles
+from collections import deque
+from contextlib import contextmanager
+from datetime import datetime
 from pathlib import Path
-from uuid import UUID
-from typing import Optional, List
-from fastapi import UploadFile, HTTPException, status
+from uuid import UUID, uuid4
+from typing import AsyncIterator, Iterator, Optional, List, Tuple
+from fastapi import HTTPException, Request, status
+from multipart.exceptions import MultipartParseError
+from multipart.multipart import MultipartParser, parse_options_header
+from sqlalchemy import select, tuple_
+from sqlalchemy.exc import IntegrityError
 from sqlalchemy.orm import Session
+from starlette.concurrency import run_in_threadpool
+from starlette.requests import ClientDisconnect
 
 from app.models.artifact import Artifact
 from app.models.experiment import Experiment
 
+# Characters allowed in stored filenames; everything else becomes "_"
+_UNSAFE_FILENAME_CHARS = re.compile(r'[^\w\s\-\.]')
+
+# Common ML artifact types, checked before the much larger mimetypes registry
+_CONTENT_TYPES = {
+    ".pkl": "application/octet-stream",
+    ".onnx": "application/octet-stream",
+    ".pt": "application/octet-stream",
+    ".h5": "application/x-hdf5",
+    ".json": "application/json",
+    ".csv": "text/csv",
+    ".npy": "application/octet-stream",
+}
+
+
+class MultipartUpload:
+    """Incremental reader for the `file` part of a multipart/form-data request.
+    
+    UploadFile spools the whole body into a SpooledTemporaryFile before the
+    handler runs. This parses request.stream() as it arrives, so only the
+    chunk in flight is held in memory.
+    """
+    FIELD_NAME = "file"
+    
+    def __init__(self, request: Request):
+        content_type, params = parse_options_header(request.headers.get("content-type", ""))
+        boundary = params.get(b"boundary")
+        if content_type != b"multipart/form-data" or not boundary:
+            raise MultipartUpload._missing_file()
+        
+        self._stream = request.stream()
+        self._header_field = b""
+        self._header_value = b""
+        self._disposition = b""
+        self._in_file = False
+        self._filename: Optional[str] = None
+        self._finished = False
+        self._pending: deque = deque()
+        self._parser = MultipartParser(boundary, callbacks={
+            "on_part_begin": self._on_part_begin,
+            "on_header_field": self._on_header_field,
+            "on_header_value": self._on_header_value,
+            "on_header_end": self._on_header_end,
+            "on_headers_finished": self._on_headers_finished,
+            "on_part_data": self._on_part_data,
+            "on_part_end": self._on_part_end,
+        })
+    
+    @staticmethod
+    def _missing_file() -> HTTPException:
+        return HTTPException(
+            status_code=status.HTTP_422_UNPROCESSABLE_ENTITY,
+            detail="Expected a multipart/form-data body with a file field"
+        )
+    
+    def _on_part_begin(self) -> None:
+        self._disposition = b""
+    
+    def _on_header_field(self, data: bytes, start: int, end: int) -> None:
+        self._header_field += data[start:end]
+    
+    def _on_header_value(self, data: bytes, start: int, end: int) -> None:
+        self._header_value += data[start:end]
+    
+    def _on_header_end(self) -> None:
+        if self._header_field.lower() == b"content-disposition":
+            self._disposition = self._header_value
+        self._header_field = b""
+        self._header_value = b""
+    
+    def _on_headers_finished(self) -> None:
+        _, options = parse_options_header(self._disposition)
+        name = options.get(b"name", b"").decode("latin-1")
+        if self._filename is None and name == self.FIELD_NAME and b"filename" in options:
+            self._filename = options[b"filename"].decode("utf-8", errors="replace")
+            self._in_file = True
+    
+    def _on_part_data(self, data: bytes, start: int, end: int) -> None:
+        if self._in_file:
+            self._pending.append(data[start:end])
+    
+    def _on_part_end(self) -> None:
+        if self._in_file:
+            self._in_file = False
+            self._finished = True
+    
+    @staticmethod
+    def _bad_body(detail: str) -> HTTPException:
+        return HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=detail)
+    
+    async def _feed(self) -> bool:
+        """Parse the next body chunk; False once the body is exhausted."""
+        try:
+            chunk = await self._stream.__anext__()
+        except (StopAsyncIteration, ClientDisconnect):
+            chunk = None
+        try:
+            if chunk is None:
+                self._parser.finalize()
+            else:
+                self._parser.write(chunk)
+        except MultipartParseError:
+            raise MultipartUpload._bad_body("There was an error parsing the body")
+        return chunk is not None
+    
+    async def filename(self) -> str:
+        """Read up to the file part's headers and return its filename."""
+        while self._filename is None:
+            if not await self._feed():
+                raise MultipartUpload._missing_file()
+        return self._filename
+    
+    async def chunks(self) -> AsyncIterator[bytes]:
+        """Yield the file part's content as it is parsed."""
+        while True:
+            while self._pending:
+                yield self._pending.popleft()
+            if self._finished:
+                return
+            if not await self._feed():
+                # Body ended inside the file part: never store a partial file
+                raise MultipartUpload._bad_body("Multipart body ended before the file part was complete")
+
 
 class ArtifactService:
     MAX_FILE_SIZE = 500 * 1024 * 1024  # 500MB
-    CHUNK_SIZE = 1024 * 1024  # 1MB chunks
+    MAX_FILENAME_LENGTH = 255  # Size of the filename column
+    CHUNK_SIZE = 1024 * 1024  # 1MB writes
     
     @staticmethod
     def sanitize_filename(filename: str) -> str:
@@ -20,9 +157,14 @@ class ArtifactService:
         # Remove path components
         filename = os.path.basename(filename)
         # Remove or replace dangerous characters
-        filename = re.sub(r'[^\w\s\-\.]', '_', filename)
+        filename = _UNSAFE_FILENAME_CHARS.sub('_', filename)
         # Remove leading/trailing dots and spaces
         filename = filename.strip('. ')
+        # Fit the column, keeping the extension where possible
+        if len(filename) > ArtifactService.MAX_FILENAME_LENGTH:
+            stem, ext = os.path.splitext(filename)
+            keep = max(ArtifactService.MAX_FILENAME_LENGTH - len(ext), 0)
+            filename = (stem[:keep] + ext)[:ArtifactService.MAX_FILENAME_LENGTH]
         # Ensure filename is not empty
         if not filename:
             raise HTTPException(
@@ -35,12 +177,18 @@ class ArtifactService:
     async def save_artifact(
         db: Session,
         experiment_id: UUID,
-        file: UploadFile,
-        artifacts_path: str
+        filename: str,
+        chunks: AsyncIterator[bytes],
+        artifacts_dir: Path
     ) -> Artifact:
-        """Save uploaded file and create artifact record."""
+        """Save uploaded file and create artifact record.
+        
+        Chunks are written as they arrive, coalesced into CHUNK_SIZE writes.
+        Database calls are blocking, so they run in the threadpool to keep
+        the event loop free while other uploads stream in.
+        """
         # Check if experiment exists
-        experiment = db.query(Experiment).filter(Experiment.id == experiment_id).first()
+        experiment = await run_in_threadpool(db.get, Experiment, experiment_id)
         if not experiment:
             raise HTTPException(
                 status_code=status.HTTP_404_NOT_FOUND,
@@ -48,40 +196,46 @@ class ArtifactService:
             )
         
         # Sanitize filename
-        safe_filename = ArtifactService.sanitize_filename(file.filename)
+        safe_filename = ArtifactService.sanitize_filename(filename)
         
-        # Create experiment directory
-        exp_dir = Path(artifacts_path) / str(experiment_id)
-        exp_dir.mkdir(parents=True, exist_ok=True)
+        # Filenames are unique per experiment
+        if await run_in_threadpool(
+            ArtifactService._filename_taken, db, experiment_id, safe_filename
+        ):
+            raise ArtifactService._conflict(safe_filename)
         
-        # Full file path
-        file_path = exp_dir / safe_filename
-        
-        # Check if file already exists
-        if file_path.exists():
-            raise HTTPException(
-                status_code=status.HTTP_409_CONFLICT,
-                detail=f"Artifact with filename '{safe_filename}' already exists"
-            )
+        # Stream into a temporary file, hashing as we go
+        tmp_dir = artifacts_dir / "tmp"
+        tmp_dir.mkdir(parents=True, exist_ok=True)
+        tmp_path = tmp_dir / uuid4().hex
+        hasher = hashlib.sha256()
         
         # Write file in chunks and track size
         total_size = 0
         try:
-            with open(file_path, "wb") as f:
-                while chunk := await file.read(ArtifactService.CHUNK_SIZE):
+            # O_EXCL guarantees the temporary file is ours alone
+            fd = os.open(tmp_path, os.O_WRONLY | os.O_CREAT | os.O_EXCL, 0o644)
+            # aiofiles runs the writes in a worker thread instead of on the event loop
+            async with aiofiles.open(fd, "wb") as f:
+                buffer = bytearray()
+                async for chunk in chunks:
                     total_size += len(chunk)
                     if total_size > ArtifactService.MAX_FILE_SIZE:
-                        f.close()
-                        file_path.unlink()  # Delete partial file
+                        # Partial file is removed by the handler below
                         raise HTTPException(
                             status_code=status.HTTP_413_REQUEST_ENTITY_TOO_LARGE,
                             detail=f"File size exceeds {ArtifactService.MAX_FILE_SIZE / (1024*1024)}MB limit"
                         )
-                    f.write(chunk)
+                    hasher.update(chunk)
+                    buffer += chunk
+                    if len(buffer) >= ArtifactService.CHUNK_SIZE:
+                        await f.write(buffer)
+                        buffer.clear()
+                if buffer:
+                    await f.write(buffer)
         except Exception as e:
             # Clean up partial file on error
-            if file_path.exists():
-                file_path.unlink()
+            tmp_path.unlink(missing_ok=True)
             if isinstance(e, HTTPException):
                 raise
             raise HTTPException(
@@ -89,58 +243,175 @@ class ArtifactService:
                 detail=f"Failed to save file: {str(e)}"
             )
         
+        # Move into content-addressed storage; identical content is stored once
+        content_hash = hasher.hexdigest()
+        file_path = ArtifactService.blob_path(artifacts_dir, content_hash)
+        file_path.parent.mkdir(parents=True, exist_ok=True)
+        
         # Create artifact record
         artifact = Artifact(
             experiment_id=experiment_id,
             filename=safe_filename,
             filepath=str(file_path),
-            size_bytes=total_size
+            size_bytes=total_size,
+            content_hash=content_hash
+        )
+        await run_in_threadpool(ArtifactService._store, db, artifact, tmp_path, file_path)
+        return artifact
+    
+    @staticmethod
+    @contextmanager
+    def _blob_lock(file_path: Path) -> Iterator[None]:
+        """Serialize linking and removing blobs in the same shard directory.
+        
+        Uploads hold it from linking a blob until its row is committed, and
+        deletes from the reference check until the unlink, so a blob is never
+        removed between another upload reusing it and that row landing. The
+        lock is taken on the directory itself, so no lock files pile up.
+        """
+        fd = os.open(file_path.parent, os.O_RDONLY)
+        try:
+            fcntl.flock(fd, fcntl.LOCK_EX)
+            yield
+        finally:
+            os.close(fd)
+    
+    @staticmethod
+    def _store(db: Session, artifact: Artifact, tmp_path: Path, file_path: Path) -> None:
+        """Link the uploaded file into place and commit its record."""
+        try:
+            with ArtifactService._blob_lock(file_path):
+                try:
+                    # Linking fails atomically if the blob exists, unlike exists() + replace()
+                    os.link(tmp_path, file_path)
+                except FileExistsError:
+                    pass
+                try:
+                    ArtifactService._persist(db, artifact)
+                except IntegrityError:
+                    # Lost a race with a concurrent upload of the same filename
+                    db.rollback()
+                    if not ArtifactService._blob_referenced(db, artifact.content_hash):
+                        file_path.unlink(missing_ok=True)
+                    raise ArtifactService._conflict(artifact.filename)
+        finally:
+            tmp_path.unlink()
+    
+    @staticmethod
+    def content_type(filename: str) -> str:
+        """Media type to serve an artifact with, from its file extension."""
+        return (
+            _CONTENT_TYPES.get(os.path.splitext(filename)[1].lower())
+            or mimetypes.guess_type(filename)[0]
+            or "application/octet-stream"
         )
+    
+    @staticmethod
+    def blob_path(artifacts_dir: Path, content_hash: str) -> Path:
+        """Storage location for content with the given SHA-256 digest.
+        
+        Two levels of sharding keep any single directory small.
+        """
+        return artifacts_dir / content_hash[:2] / content_hash[2:4] / content_hash
+    
+    @staticmethod
+    def _filename_taken(db: Session, experiment_id: UUID, filename: str) -> bool:
+        """Check whether an experiment already has an artifact with this name."""
+        return db.execute(
+            select(Artifact.id)
+            .where(Artifact.experiment_id == experiment_id)
+            .where(Artifact.filename == filename)
+        ).first() is not None
+    
+    @staticmethod
+    def _conflict(filename: str) -> HTTPException:
+        return HTTPException(
+            status_code=status.HTTP_409_CONFLICT,
+            detail=f"Artifact with filename '{filename}' already exists"
+        )
+    
+    @staticmethod
+    def _blob_referenced(db: Session, content_hash: Optional[str]) -> bool:
+        """Check whether any artifact record still points at this content."""
+        return content_hash is not None and db.execute(
+            select(Artifact.id).where(Artifact.content_hash == content_hash)
+        ).first() is not None
+    
+    @staticmethod
+    def _persist(db: Session, artifact: Artifact) -> None:
+        """Insert an artifact record and reload server-side defaults."""
         db.add(artifact)
         db.commit()
         db.refresh(artifact)
-        
-        return artifact
     
     @staticmethod
     def get_artifact(db: Session, artifact_id: UUID) -> Optional[Artifact]:
         """Get artifact by ID."""
-        return db.query(Artifact).filter(Artifact.id == artifact_id).first()
+        return db.get(Artifact, artifact_id)
     
     @staticmethod
     def list_artifacts(
         db: Session,
         experiment_id: UUID,
         skip: int = 0,
-        limit: int = 100
+        limit: int = 100,
+        after: Optional[Tuple[datetime, UUID]] = None
     ) -> List[Artifact]:
-        """List artifacts for an experiment."""
+        """List artifacts for an experiment, newest first.
+        
+        after is a keyset cursor - the (uploaded_at, id) of the last artifact
+        already seen. It seeks straight to the next page through the
+        (experiment_id, uploaded_at, id) index instead of counting past
+        skipped rows.
+        """
+        query = db.query(Artifact).filter(Artifact.experiment_id == experiment_id)
+        if after is not None:
+            query = query.filter(tuple_(Artifact.uploaded_at, Artifact.id) < after)
         return (
-            db.query(Artifact)
-            .filter(Artifact.experiment_id == experiment_id)
-            .order_by(Artifact.uploaded_at.desc())
+            query
+            .order_by(Artifact.uploaded_at.desc(), Artifact.id.desc())
             .offset(skip)
             .limit(limit)
             .all()
         )
     
+    @staticmethod
+    def cursor(artifact: Artifact) -> str:
+        """Keyset cursor pointing just past this artifact"""
+        return f"{artifact.uploaded_at.isoformat()}_{artifact.id}"
+    
+    @staticmethod
+    def parse_cursor(cursor: str) -> Tuple[datetime, UUID]:
+        """Inverse of cursor(); raises 400 for malformed values."""
+        try:
+            uploaded_at, artifact_id = cursor.rsplit("_", 1)
+            return datetime.fromisoformat(uploaded_at), UUID(artifact_id)
+        except ValueError:
+            raise HTTPException(
+                status_code=status.HTTP_400_BAD_REQUEST,
+                detail=f"Invalid cursor: {cursor}"
+            )
+    
     @staticmethod
     def delete_artifact(db: Session, artifact_id: UUID) -> bool:
         """Delete artifact record and file."""
-        artifact = db.query(Artifact).filter(Artifact.id == artifact_id).first()
+        artifact = db.get(Artifact, artifact_id)
         if not artifact:
             return False
         
-        # Delete file from disk
         file_path = Path(artifact.filepath)
-        if file_path.exists():
-            try:
-                file_path.unlink()
-            except Exception:
-                pass  # Continue even if file deletion fails
+        content_hash = artifact.content_hash
         
         # Delete database record
         db.delete(artifact)
         db.commit()
         
+        # Delete file from disk unless other artifacts share the same content
+        try:
+            with ArtifactService._blob_lock(file_path):
+                if not ArtifactService._blob_referenced(db, content_hash):
+                    file_path.unlink(missing_ok=True)
+        except OSError:
+            pass  # Continue even if file deletion fails
+        
         return True
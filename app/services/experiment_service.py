@@ -1,5 +1,6 @@
-from sqlalchemy.orm import Session
-from sqlalchemy import select
+from sqlalchemy.orm import Session, Query
+from sqlalchemy import select, delete, cast, text, any_, bindparam, func
+from sqlalchemy.dialects.postgresql import JSONB, ARRAY, UUID as PG_UUID
 from typing import List, Optional
 from uuid import UUID
 
@@ -10,6 +11,11 @@ from app.schemas.experiment import ExperimentCreate, StatusUpdate, TagsUpdate
 class ExperimentService:
     """Service for experiment database operations"""
     
+    # Below this many rows an exact COUNT(*) is cheap enough to always run
+    EXACT_COUNT_THRESHOLD = 10000
+    # Upper bound on the number of experiments fetched in one comparison
+    MAX_COMPARE_IDS = 100
+    
     @staticmethod
     def create_experiment(db: Session, experiment: ExperimentCreate) -> Experiment:
         """Create a new experiment with status 'running'"""
@@ -27,23 +33,96 @@ class ExperimentService:
     @staticmethod
     def get_experiment(db: Session, experiment_id: UUID) -> Optional[Experiment]:
         """Get a single experiment by ID"""
-        return db.query(Experiment).filter(Experiment.id == experiment_id).first()
+        return db.get(Experiment, experiment_id)
+    
+    @staticmethod
+    def filter_by_tag(db: Session, query: Query, tag: str) -> Query:
+        """Restrict a query to experiments carrying the given tag.
+        
+        On PostgreSQL this is JSONB containment, so the GIN index on tags can
+        serve the lookup; elsewhere tags are plain JSON, searched with json_each.
+        """
+        if db.get_bind().dialect.name == "postgresql":
+            return query.filter(Experiment.tags.op("@>")(cast([tag], JSONB)))
+        
+        tag_values = func.json_each(Experiment.tags).table_valued("value")
+        return query.filter(select(tag_values.c.value).where(tag_values.c.value == tag).exists())
     
     @staticmethod
     def get_experiments(
         db: Session,
         page: int = 1,
         size: int = 50,
-        status: Optional[str] = None
+        status: Optional[str] = None,
+        tag: Optional[str] = None
     ) -> List[Experiment]:
-        """Get experiments with pagination and optional status filter"""
+        """Get experiments with pagination and optional status/tag filters"""
+        query = ExperimentService._filtered_query(db, status, tag)
+        
+        offset = (page - 1) * size
+        return query.offset(offset).limit(size).all()
+    
+    @staticmethod
+    def _filtered_query(
+        db: Session,
+        status: Optional[str] = None,
+        tag: Optional[str] = None
+    ) -> Query:
+        """Build the experiment query shared by listing and counting"""
         query = db.query(Experiment)
         
         if status:
             query = query.filter(Experiment.status == status)
         
-        offset = (page - 1) * size
-        return query.offset(offset).limit(size).all()
+        if tag:
+            query = ExperimentService.filter_by_tag(db, query, tag)
+        
+        return query
+    
+    @staticmethod
+    def approximate_count(db: Session) -> int:
+        """Estimate the number of experiments from planner statistics.
+        
+        Reads pg_class.reltuples, which is O(1) but only as fresh as the
+        last VACUUM/ANALYZE. Returns -1 if the table was never analyzed.
+        """
+        estimate = db.execute(
+            text("SELECT reltuples::BIGINT FROM pg_class WHERE relname = 'experiments'")
+        ).scalar()
+        return -1 if estimate is None else estimate
+    
+    @staticmethod
+    def _status_frequency(db: Session, status: str) -> Optional[float]:
+        """Fraction of experiments with the given status, from pg_stats"""
+        return db.execute(
+            text(
+                "SELECT most_common_freqs[array_position(most_common_vals::text::text[], :status)] "
+                "FROM pg_stats WHERE tablename = 'experiments' AND attname = 'status'"
+            ),
+            {"status": status}
+        ).scalar()
+    
+    @staticmethod
+    def count_experiments(
+        db: Session,
+        status: Optional[str] = None,
+        tag: Optional[str] = None
+    ) -> int:
+        """Count experiments for pagination totals.
+        
+        On PostgreSQL, large tables are counted from planner statistics
+        instead of a full COUNT(*), so the result is approximate there.
+        """
+        if db.get_bind().dialect.name == "postgresql" and not tag:
+            estimate = ExperimentService.approximate_count(db)
+            if estimate >= ExperimentService.EXACT_COUNT_THRESHOLD:
+                if not status:
+                    return estimate
+                frequency = ExperimentService._status_frequency(db, status)
+                if frequency is not None:
+                    return int(estimate * frequency)
+        
+        return ExperimentService._filtered_query(db, status, tag).count()
     
     @staticmethod
     def update_status(
@@ -52,9 +131,7 @@ class ExperimentService:
         status_update: StatusUpdate
     ) -> Optional[Experiment]:
         """Update experiment status"""
-        db_experiment = db.query(Experiment).filter(
-            Experiment.id == experiment_id
-        ).first()
+        db_experiment = db.get(Experiment, experiment_id)
         
         if db_experiment:
             db_experiment.status = status_update.status
@@ -65,8 +142,23 @@ class ExperimentService:
     
     @staticmethod
     def get_experiments_by_ids(db: Session, ids: List[UUID]) -> List[Experiment]:
-        """Get multiple experiments by their IDs"""
-        return db.query(Experiment).filter(Experiment.id.in_(ids)).all()
+        """Get multiple experiments by their IDs, in the order requested.
+        
+        On PostgreSQL the IDs are bound as one UUID[] parameter (= ANY), so a
+        single plan serves every list length instead of one per IN-list size.
+        """
+        if db.get_bind().dialect.name == "postgresql":
+            condition = Experiment.id == any_(
+                bindparam("ids", ids, type_=ARRAY(PG_UUID(as_uuid=True)))
+            )
+        else:
+            condition = Experiment.id.in_(ids)
+        
+        found = {
+            experiment.id: experiment
+            for experiment in db.execute(select(Experiment).where(condition)).scalars()
+        }
+        return [found[id] for id in dict.fromkeys(ids) if id in found]
     
     @staticmethod
     def update_tags(
@@ -75,9 +167,7 @@ class ExperimentService:
         tags_update: TagsUpdate
     ) -> Optional[Experiment]:
         """Update experiment tags"""
-        db_experiment = db.query(Experiment).filter(
-            Experiment.id == experiment_id
-        ).first()
+        db_experiment = db.get(Experiment, experiment_id)
         
         if db_experiment:
             db_experiment.tags = tags_update.tags
@@ -88,14 +178,11 @@ class ExperimentService:
     
     @staticmethod
     def delete_experiment(db: Session, experiment_id: UUID) -> bool:
-        """Delete an experiment and all its associated data"""
-        db_experiment = db.query(Experiment).filter(
-            Experiment.id == experiment_id
-        ).first()
+        """Delete an experiment and all its associated data.
         
-        if db_experiment:
-            db.delete(db_experiment)
-            db.commit()
-            return True
-        
-        return False
+        A single DELETE; metrics, summaries and artifacts go with it through
+        their ON DELETE CASCADE foreign keys.
+        """
+        result = db.execute(delete(Experiment).where(Experiment.id == experiment_id))
+        db.commit()
+        return result.rowcount > 0
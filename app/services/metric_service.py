@@ -1,35 +1,151 @@
+import orjson
 from sqlalchemy.orm import Session
-from sqlalchemy import func, select, desc
-from typing import List, Optional, Dict, Any
+from sqlalchemy import select, case, bindparam, lambda_stmt, Select
+from sqlalchemy.engine import Row
+from sqlalchemy.dialects.postgresql import insert as pg_insert
+from sqlalchemy.dialects.sqlite import insert as sqlite_insert
+from typing import List, Optional, Dict, Any, Iterator, Tuple
 from uuid import UUID
 
+from app.models.experiment import Experiment
 from app.models.metric import Metric
+from app.models.metric_summary import MetricSummary
 from app.schemas.metric import MetricCreate
 
+_SUMMARY_STMT = lambda_stmt(
+    lambda: select(
+        MetricSummary.metric_name,
+        MetricSummary.min_value,
+        MetricSummary.max_value,
+        MetricSummary.sum_value,
+        MetricSummary.count,
+        MetricSummary.latest_value
+    )
+    .where(MetricSummary.experiment_id == bindparam("experiment_id"))
+    .order_by(MetricSummary.metric_name)
+)
+
 
 class MetricService:
     """Service for metric database operations"""
     
+    # Rows fetched per round trip when streaming metric history
+    STREAM_BATCH_SIZE = 1000
+    
     @staticmethod
     def log_metrics_bulk(
         db: Session,
         experiment_id: UUID,
         metrics: List[MetricCreate]
-    ) -> int:
-        """Bulk insert metrics for an experiment"""
-        db_metrics = [
-            Metric(
-                experiment_id=experiment_id,
-                step=metric.step,
-                metric_name=metric.metric_name,
-                value=metric.value
+    ) -> Optional[int]:
+        """Bulk insert metrics for an experiment.
+        
+        The experiment row is key-share locked in the same transaction as the
+        insert, so it cannot be deleted mid-batch. The metric_summary rollup
+        is updated in that transaction too. Returns the number of new points
+        stored, or None if the experiment does not exist.
+        """
+        experiment = db.execute(
+            select(Experiment.id)
+            .where(Experiment.id == experiment_id)
+            .with_for_update(read=True, key_share=True)
+        ).first()
+        if experiment is None:
+            return None
+        
+        # (metric_name, step) is unique per experiment; within a batch the
+        # last value for a point wins
+        points = {(m.metric_name, m.step): m for m in metrics}
+        
+        # Points that already exist (e.g. a client retrying a request) are
+        # skipped; RETURNING reports only the rows actually inserted
+        stmt = (
+            MetricService._dialect_insert(db)(Metric)
+            .on_conflict_do_nothing(
+                index_elements=[Metric.experiment_id, Metric.metric_name, Metric.step]
             )
-            for metric in metrics
-        ]
+            .returning(Metric.metric_name, Metric.step, Metric.value)
+        )
+        inserted = db.execute(
+            stmt,
+            [
+                {
+                    "experiment_id": experiment_id,
+                    "step": metric.step,
+                    "metric_name": metric.metric_name,
+                    "value": metric.value
+                }
+                for metric in points.values()
+            ]
+        ).all()
+        
+        if inserted:
+            MetricService._update_summaries(db, experiment_id, inserted)
         
-        db.bulk_save_objects(db_metrics)
         db.commit()
-        return len(db_metrics)
+        return len(inserted)
+    
+    @staticmethod
+    def _dialect_insert(db: Session):
+        """INSERT construct with ON CONFLICT support for the session's backend"""
+        return pg_insert if db.get_bind().dialect.name == "postgresql" else sqlite_insert
+    
+    @staticmethod
+    def _update_summaries(
+        db: Session,
+        experiment_id: UUID,
+        metrics: List[Row]
+    ) -> None:
+        """Fold newly inserted points into the metric_summary rollup with one upsert"""
+        batch: Dict[str, Dict[str, Any]] = {}
+        for metric in metrics:
+            row = batch.get(metric.metric_name)
+            if row is None:
+                batch[metric.metric_name] = {
+                    "experiment_id": experiment_id,
+                    "metric_name": metric.metric_name,
+                    "min_value": metric.value,
+                    "max_value": metric.value,
+                    "sum_value": metric.value,
+                    "count": 1,
+                    "latest_step": metric.step,
+                    "latest_value": metric.value
+                }
+                continue
+            row["min_value"] = min(row["min_value"], metric.value)
+            row["max_value"] = max(row["max_value"], metric.value)
+            row["sum_value"] += metric.value
+            row["count"] += 1
+            if metric.step > row["latest_step"]:
+                row["latest_step"] = metric.step
+                row["latest_value"] = metric.value
+        
+        stmt = MetricService._dialect_insert(db)(MetricSummary).values(list(batch.values()))
+        new = stmt.excluded
+        newer = new.latest_step > MetricSummary.latest_step
+        db.execute(
+            stmt.on_conflict_do_update(
+                index_elements=[MetricSummary.experiment_id, MetricSummary.metric_name],
+                set_={
+                    "min_value": case(
+                        (new.min_value < MetricSummary.min_value, new.min_value),
+                        else_=MetricSummary.min_value
+                    ),
+                    "max_value": case(
+                        (new.max_value > MetricSummary.max_value, new.max_value),
+                        else_=MetricSummary.max_value
+                    ),
+                    "sum_value": MetricSummary.sum_value + new.sum_value,
+                    "count": MetricSummary.count + new.count,
+                    "latest_step": case(
+                        (newer, new.latest_step), else_=MetricSummary.latest_step
+                    ),
+                    "latest_value": case(
+                        (newer, new.latest_value), else_=MetricSummary.latest_value
+                    )
+                }
+            )
+        )
     
     @staticmethod
     def get_metrics(
@@ -38,62 +154,112 @@ class MetricService:
         metric_name: Optional[str] = None,
         limit: int = 1000,
         offset: int = 0
-    ) -> List[Metric]:
-        """Get metrics for an experiment with optional filtering"""
-        query = db.query(Metric).filter(Metric.experiment_id == experiment_id)
+    ) -> List[Dict[str, Any]]:
+        """Get metrics for an experiment with optional filtering.
+        
+        Selects plain column rows rather than ORM entities, since the result
+        is only serialized and never modified.
+        """
+        stmt = (
+            MetricService._metrics_select(experiment_id, metric_name)
+            .offset(offset)
+            .limit(limit)
+        )
+        return db.execute(stmt).mappings().all()
+    
+    @staticmethod
+    def get_metric_columns(
+        db: Session,
+        experiment_id: UUID,
+        metric_name: Optional[str] = None,
+        limit: int = 1000,
+        offset: int = 0
+    ) -> Dict[str, list]:
+        """Get step, name and value of an experiment's metrics as parallel lists.
+        
+        Arrays of primitives are smaller on the wire than a list of objects
+        and need no per-row dict on either side.
+        """
+        stmt = (
+            MetricService._metrics_select(
+                experiment_id,
+                metric_name,
+                columns=(Metric.step, Metric.metric_name, Metric.value)
+            )
+            .offset(offset)
+            .limit(limit)
+        )
+        rows = db.execute(stmt).all()
+        steps, names, values = zip(*rows) if rows else ((), (), ())
+        return {
+            'step': list(steps),
+            'metric_name': list(names),
+            'value': list(values)
+        }
+    
+    @staticmethod
+    def stream_metrics(
+        db: Session,
+        experiment_id: UUID,
+        metric_name: Optional[str] = None
+    ) -> Iterator[bytes]:
+        """Yield an experiment's metrics as newline-delimited JSON.
+        
+        Rows are pulled through a server-side cursor in batches of
+        STREAM_BATCH_SIZE, so memory stays flat regardless of history length.
+        """
+        stmt = MetricService._metrics_select(experiment_id, metric_name)
+        result = db.execute(
+            stmt.execution_options(yield_per=MetricService.STREAM_BATCH_SIZE)
+        )
+        for row in result.mappings():
+            yield orjson.dumps(dict(row)) + b"\n"
+    
+    @staticmethod
+    def _metrics_select(
+        experiment_id: UUID,
+        metric_name: Optional[str] = None,
+        columns: Optional[Tuple[Any, ...]] = None
+    ) -> Select:
+        """Build the step-ordered metric history query"""
+        if columns is None:
+            columns = (
+                Metric.id,
+                Metric.experiment_id,
+                Metric.step,
+                Metric.metric_name,
+                Metric.value,
+                Metric.timestamp
+            )
+        stmt = select(*columns).where(Metric.experiment_id == experiment_id)
         
         if metric_name:
-            query = query.filter(Metric.metric_name == metric_name)
+            stmt = stmt.where(Metric.metric_name == metric_name)
         
-        return query.order_by(Metric.step).offset(offset).limit(limit).all()
+        return stmt.order_by(Metric.step)
     
     @staticmethod
     def get_metrics_summary(
         db: Session,
         experiment_id: UUID
     ) -> List[Dict[str, Any]]:
-        """Get aggregated summary statistics per metric using SQL GROUP BY"""
-        # Subquery to get latest value per metric
-        latest_subquery = (
-            db.query(
-                Metric.metric_name,
-                Metric.value.label('latest_value')
-            )
-            .filter(Metric.experiment_id == experiment_id)
-            .distinct(Metric.metric_name)
-            .order_by(Metric.metric_name, desc(Metric.step))
-            .subquery()
-        )
+        """Get aggregated summary statistics per metric.
         
-        # Main query with aggregations
-        results = (
-            db.query(
-                Metric.metric_name,
-                func.min(Metric.value).label('min'),
-                func.max(Metric.value).label('max'),
-                func.avg(Metric.value).label('mean'),
-                func.count(Metric.id).label('count'),
-                latest_subquery.c.latest_value.label('latest')
-            )
-            .filter(Metric.experiment_id == experiment_id)
-            .outerjoin(
-                latest_subquery,
-                Metric.metric_name == latest_subquery.c.metric_name
-            )
-            .group_by(
-                Metric.metric_name,
-                latest_subquery.c.latest_value
-            )
-            .all()
-        )
+        Reads the metric_summary rollup, so the cost is one row per metric
+        name no matter how many points were logged. The rollup is updated in
+        the same transaction as every insert, so the result is never stale.
+        """
+        results = db.execute(
+            _SUMMARY_STMT, {"experiment_id": experiment_id}
+        ).all()
         
         return [
             {
                 'metric_name': r.metric_name,
-                'min': float(r.min),
-                'max': float(r.max),
-                'mean': float(r.mean),
-                'latest': float(r.latest),
+                'min': r.min_value,
+                'max': r.max_value,
+                'mean': r.sum_value / r.count,
+                'latest': r.latest_value,
                 'count': r.count
             }
             for r in results
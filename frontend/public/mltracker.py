@@ -22,19 +22,64 @@ That's it! Check http://localhost:3000 to see your results.
 """
 
 import requests
+from requests.adapters import HTTPAdapter
 import json
+import os
+import atexit
+import logging
+import math
+import queue
+import threading
 from typing import Any, Dict, List, Optional
 from datetime import datetime
 
+try:
+    # Optional: streams uploads from disk instead of building them in memory
+    from requests_toolbelt import MultipartEncoder
+except ImportError:
+    MultipartEncoder = None
+
+
+logger = logging.getLogger("mltracker")
+
+# The API accepts at most this many metrics per request
+MAX_BATCH_SIZE = 1000
+
+# Limits the API enforces on each metric; values are stored in single precision
+MAX_METRIC_NAME_LENGTH = 100
+FLOAT32_MAX = 3.4028234663852886e38
+FLOAT32_MIN = 1.1754943508222875e-38
+
+# Tells the background sender to drain its queue and exit
+_STOP = object()
+
 
 class SimpleMLTracker:
     """Super easy ML experiment tracker - just 4 methods you need"""
     
-    def __init__(self, api_url: str = "http://localhost:8000"):
+    def __init__(self, api_url: str = "http://localhost:8000", verbose: bool = False):
+        """
+        Metrics are sent by a background thread, so log() never waits on
+        the network. Set verbose=True to print every logged metric;
+        otherwise they go to the "mltracker" logger at DEBUG level.
+        """
         self.api_url = api_url
+        self.verbose = verbose
         self.experiment_id = None
         self.experiment_name = None
         
+        # One session reuses the same connections for every request. The
+        # background sender and the caller's thread each keep one open.
+        self._session = requests.Session()
+        adapter = HTTPAdapter(pool_connections=1, pool_maxsize=4)
+        self._session.mount("http://", adapter)
+        self._session.mount("https://", adapter)
+        
+        self._queue: Optional[queue.Queue] = None
+        self._worker: Optional[threading.Thread] = None
+        # Don't lose queued metrics if the script ends without finish()
+        atexit.register(self._stop_worker)
+        
     def start(self, name: str, tags: Optional[List[str]] = None, **hyperparameters):
         """
         Start tracking your experiment
@@ -47,7 +92,7 @@ class SimpleMLTracker:
                          batch_size=32)
         """
         try:
-            response = requests.post(
+            response = self._session.post(
                 f"{self.api_url}/experiments",
                 json={
                     "name": name,
@@ -60,6 +105,7 @@ class SimpleMLTracker:
             data = response.json()
             self.experiment_id = data["id"]
             self.experiment_name = name
+            self._start_worker()
             
             print(f"✅ Started experiment: {name}")
             print(f"   ID: {self.experiment_id}")
@@ -75,26 +121,48 @@ class SimpleMLTracker:
         Log a metric (like accuracy or loss)
         
         Use it like: tracker.log("accuracy", 0.95, step=10)
+        
+        Returns immediately; the metric is sent in the background.
+        Metrics the API would reject (no step, NaN or infinite values)
+        are dropped with a warning.
         """
         if not self.experiment_id:
             raise ValueError("No active experiment. Call start() first!")
         
-        try:
-            response = requests.post(
-                f"{self.api_url}/experiments/{self.experiment_id}/metrics",
-                json={
-                    "metric_name": metric_name,
-                    "value": float(value),
-                    "step": step
-                }
-            )
-            response.raise_for_status()
-            
+        # Metrics are sent in batches and the API rejects a batch as a whole,
+        # so drop anything it would refuse here instead of losing its neighbours
+        value = float(value)
+        problem = self._invalid_metric(metric_name, value, step)
+        if problem:
+            logger.warning("Not logging %s = %s @ step %s: %s", metric_name, value, step, problem)
+            return
+        
+        # A failed finish() leaves the experiment active but the sender stopped
+        if self._queue is None:
+            self._start_worker()
+        self._queue.put({"metric_name": metric_name, "value": value, "step": step})
+        
+        if self.verbose:
             step_str = f" @ step {step}" if step is not None else ""
             print(f"📊 {metric_name} = {value:.4f}{step_str}")
-            
-        except Exception as e:
-            print(f"⚠️  Failed to log metric: {e}")
+        else:
+            # Arguments are only formatted if DEBUG logging is enabled
+            logger.debug("%s = %s @ step %s", metric_name, value, step)
+    
+    @staticmethod
+    def _invalid_metric(metric_name: str, value: float, step: Optional[int]) -> Optional[str]:
+        """Why the API would reject this metric, or None if it is fine"""
+        if step is None:
+            return "a step is required"
+        if step < 0:
+            return "step must not be negative"
+        if len(metric_name) > MAX_METRIC_NAME_LENGTH:
+            return f"name is longer than {MAX_METRIC_NAME_LENGTH} characters"
+        if not math.isfinite(value) or abs(value) > FLOAT32_MAX:
+            return "value must be finite and fit in single precision"
+        if value != 0.0 and abs(value) < FLOAT32_MIN:
+            return "value is too small for single precision; log 0.0 instead"
+        return None
     
     def log_many(self, metrics: Dict[str, float], step: Optional[int] = None):
         """
@@ -111,6 +179,69 @@ class SimpleMLTracker:
         for name, value in metrics.items():
             self.log(name, value, step)
     
+    def flush(self):
+        """
+        Wait until every logged metric has been sent
+        
+        finish() calls it for you.
+        """
+        if self._queue is not None:
+            self._queue.join()
+    
+    def _start_worker(self):
+        """Start the background sender for the current experiment"""
+        self._stop_worker()
+        self._queue = queue.Queue()
+        self._worker = threading.Thread(
+            target=self._send_metrics,
+            args=(self.experiment_id, self._queue),
+            name="mltracker-sender",
+            daemon=True
+        )
+        self._worker.start()
+    
+    def _stop_worker(self):
+        """Send whatever is still queued, then stop the background sender"""
+        if self._worker is None:
+            return
+        self._queue.put(_STOP)
+        self._worker.join()
+        self._worker = None
+        self._queue = None
+    
+    def _send_metrics(self, experiment_id: str, pending: queue.Queue):
+        """Background loop: post everything queued so far as one batch"""
+        while True:
+            # Block for the first metric, then take whatever else is waiting
+            items = [pending.get()]
+            while items[-1] is not _STOP and len(items) < MAX_BATCH_SIZE:
+                try:
+                    items.append(pending.get_nowait())
+                except queue.Empty:
+                    break
+            
+            batch = [item for item in items if item is not _STOP]
+            if batch:
+                self._post_metrics(experiment_id, batch)
+            for _ in items:
+                pending.task_done()
+            
+            if items[-1] is _STOP:
+                return
+    
+    def _post_metrics(self, experiment_id: str, batch: List[Dict[str, Any]]):
+        """Send one batch of metrics"""
+        try:
+            response = self._session.post(
+                f"{self.api_url}/experiments/{experiment_id}/metrics",
+                json={"metrics": batch}
+            )
+            response.raise_for_status()
+            
+        except Exception as e:
+            # Shown even without logging configured, like the other warnings
+            logger.warning("Failed to log %d metric(s): %s", len(batch), e)
+    
     def save_model(self, file_path: str, artifact_type: str = "model"):
         """
         Upload your model file (or any file)
@@ -118,19 +249,34 @@ class SimpleMLTracker:
         Examples:
             tracker.save_model("model.pkl")
             tracker.save_model("plot.png", artifact_type="visualization")
+        
+        Install requests-toolbelt to stream large files instead of
+        loading them into memory first.
         """
         if not self.experiment_id:
             raise ValueError("No active experiment. Call start() first!")
         
+        url = f"{self.api_url}/artifacts/experiments/{self.experiment_id}/upload"
+        
         try:
             with open(file_path, 'rb') as f:
-                files = {'file': f}
-                data = {'artifact_type': artifact_type}
-                response = requests.post(
-                    f"{self.api_url}/experiments/{self.experiment_id}/artifacts",
-                    files=files,
-                    data=data
-                )
+                if MultipartEncoder is not None:
+                    # Read from the file in chunks as the request is sent
+                    encoder = MultipartEncoder(fields={
+                        'file': (os.path.basename(file_path), f, 'application/octet-stream'),
+                        'artifact_type': artifact_type
+                    })
+                    response = self._session.post(
+                        url,
+                        data=encoder,
+                        headers={'Content-Type': encoder.content_type}
+                    )
+                else:
+                    response = self._session.post(
+                        url,
+                        files={'file': f},
+                        data={'artifact_type': artifact_type}
+                    )
             response.raise_for_status()
             print(f"📦 Uploaded: {file_path}")
             
@@ -148,8 +294,10 @@ class SimpleMLTracker:
             print("⚠️  No active experiment to finish")
             return
         
+        self._stop_worker()
+        
         try:
-            response = requests.put(
+            response = self._session.put(
                 f"{self.api_url}/experiments/{self.experiment_id}/status",
                 json={"status": status}
             )
@@ -176,7 +324,7 @@ class SimpleMLTracker:
         
         try:
             # Get current experiment
-            response = requests.get(f"{self.api_url}/experiments/{self.experiment_id}")
+            response = self._session.get(f"{self.api_url}/experiments/{self.experiment_id}")
             response.raise_for_status()
             current_tags = response.json().get("tags", [])
             
@@ -184,7 +332,7 @@ class SimpleMLTracker:
             new_tags = list(set(current_tags + list(tags)))
             
             # Update
-            response = requests.put(
+            response = self._session.put(
                 f"{self.api_url}/experiments/{self.experiment_id}/tags",
                 json={"tags": new_tags}
             )
@@ -0,0 +1,189 @@
+from uuid import UUID
+
+import httpx
+import pytest
+from sqlalchemy import create_engine, delete, event, insert
+from sqlalchemy.orm import sessionmaker
+from sqlalchemy.pool import QueuePool
+
+from app import models  # noqa: F401  registers every model on Base.metadata
+from app.main import app
+from app.database import Base, get_db
+from app.models.experiment import Experiment
+from app.models.metric import Metric
+from app.schemas.experiment import ExperimentResponse
+
+# Named shared-cache in-memory SQLite: every pooled connection sees the same database
+SQLALCHEMY_DATABASE_URL = "sqlite+pysqlite:///file:testdb?mode=memory&cache=shared&uri=true"
+
+engine = create_engine(
+    SQLALCHEMY_DATABASE_URL,
+    connect_args={"check_same_thread": False, "uri": True},
+    poolclass=QueuePool,
+    pool_size=5,
+)
+TestingSessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
+
+
+@event.listens_for(engine, "connect")
+def _sqlite_pragmas(dbapi_connection, connection_record):
+    """Test data is throwaway, so skip journaling and fsync.
+    
+    Foreign keys are enforced so ON DELETE CASCADE behaves as on PostgreSQL.
+    """
+    cursor = dbapi_connection.cursor()
+    cursor.execute("PRAGMA foreign_keys=ON")
+    cursor.execute("PRAGMA synchronous=OFF")
+    cursor.execute("PRAGMA journal_mode=MEMORY")
+    cursor.execute("PRAGMA temp_store=MEMORY")
+    cursor.execute("PRAGMA cache_size=-64000")
+    cursor.close()
+
+
+@event.listens_for(engine, "connect")
+def _disable_pysqlite_transactions(dbapi_connection, connection_record):
+    # pysqlite's implicit BEGIN breaks SAVEPOINT; let SQLAlchemy emit it
+    dbapi_connection.isolation_level = None
+
+
+@event.listens_for(engine, "begin")
+def _begin(connection):
+    connection.exec_driver_sql("BEGIN")
+
+
+# Build the schema at import, before collection finishes, so no test pays for it.
+# The in-memory database is freed when its last connection closes, so hold one open.
+_keepalive = engine.connect()
+Base.metadata.create_all(bind=engine)
+
+
+@pytest.fixture(scope="session")
+def test_db():
+    """Schema built at import; kept as the dependency tests declare on the database"""
+    # No drop_all: DDL would invalidate SQLite's cached statements, and the
+    # in-memory database goes away with this last connection anyway
+    yield
+    _keepalive.close()
+
+
+@pytest.fixture
+def db_connection(test_db):
+    """Connection inside a transaction that is rolled back after each test"""
+    connection = engine.connect()
+    transaction = connection.begin()
+    yield connection
+    transaction.rollback()
+    connection.close()
+
+
+@pytest.fixture
+def db_session(db_connection):
+    """Session on this test's connection; its commits only release a SAVEPOINT"""
+    db = TestingSessionLocal(bind=db_connection, join_transaction_mode="create_savepoint")
+    try:
+        yield db
+    finally:
+        db.close()
+
+
+@pytest.fixture
+def file_engine(tmp_path):
+    """File-backed SQLite engine with the schema, for tests of concurrent requests.
+    
+    The shared in-memory database locks whole tables between connections,
+    so concurrent writers need a database of their own.
+    """
+    file_engine = create_engine(
+        f"sqlite:///{tmp_path / 'test.db'}", connect_args={"check_same_thread": False}
+    )
+    event.listen(file_engine, "connect", _sqlite_pragmas)
+    Base.metadata.create_all(bind=file_engine)
+    yield file_engine
+    file_engine.dispose()
+
+
+@pytest.fixture
+def anyio_backend():
+    """Run async tests on asyncio only"""
+    return "asyncio"
+
+
+@pytest.fixture
+async def client(db_connection):
+    """Async client calling the app in-process, bound to this test's transaction"""
+    def override_get_db():
+        # Commits release a SAVEPOINT instead of ending the test's transaction
+        db = TestingSessionLocal(bind=db_connection, join_transaction_mode="create_savepoint")
+        try:
+            yield db
+        finally:
+            db.close()
+    
+    app.dependency_overrides[get_db] = override_get_db
+    # ASGITransport skips TestClient's per-request hop through a portal thread
+    transport = httpx.ASGITransport(app=app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://test") as c:
+        yield c
+    app.dependency_overrides.clear()
+
+
+@pytest.fixture
+async def experiment(client):
+    """Create a test experiment"""
+    response = await client.post(
+        "/experiments",
+        json={"name": "Test Experiment"}
+    )
+    return response.json()
+
+
+@pytest.fixture(scope="module")
+def readonly_experiment(test_db):
+    """One committed experiment shared by a module's tests that only read it"""
+    # Sessions are closed straight away; an open read would table-lock the shared cache
+    with TestingSessionLocal(expire_on_commit=False) as db:
+        experiment = Experiment(name="Read-only Experiment", hyperparameters={})
+        db.add(experiment)
+        db.commit()
+    yield ExperimentResponse.model_validate(experiment).model_dump(mode="json")
+    with TestingSessionLocal() as db:
+        db.execute(delete(Experiment).where(Experiment.id == experiment.id))
+        db.commit()
+
+
+@pytest.fixture
+def seed_experiments(db_connection):
+    """Insert experiments directly, for tests that don't exercise creation"""
+    def seed(n, status="running", tags=()):
+        db = TestingSessionLocal(
+            bind=db_connection,
+            join_transaction_mode="create_savepoint",
+            expire_on_commit=False
+        )
+        try:
+            experiments = [
+                Experiment(name=f"Experiment {i}", status=status, hyperparameters={}, tags=list(tags))
+                for i in range(n)
+            ]
+            db.add_all(experiments)
+            db.commit()
+            return experiments
+        finally:
+            db.close()
+    
+    return seed
+
+
+@pytest.fixture
+def seed_metrics(db_connection):
+    """Bulk-insert n loss rows (steps 0..n-1), for tests that only read metrics"""
+    def seed(experiment_id, n):
+        db_connection.execute(
+            insert(Metric),
+            [
+                {"experiment_id": UUID(experiment_id), "step": i, "metric_name": "loss", "value": 0.5}
+                for i in range(n)
+            ]
+        )
+    
+    return seed
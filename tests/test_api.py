@@ -2,47 +2,22 @@ import pytest
 import io
 from pathlib import Path
 from fastapi.testclient import TestClient
-from sqlalchemy import create_engine
-from sqlalchemy.orm import sessionmaker
 from uuid import uuid4
 
 from app.main import app
-from app.database import Base, get_db
+from app.routers import artifacts as artifacts_router
+from app.database import get_db
 from app.models.experiment import Experiment
 
 
-# In-memory SQLite for testing
-SQLTEST_DATABASE_URL = "sqlite:///:memory:"
-engine = create_engine(
-    SQLTEST_DATABASE_URL, connect_args={"check_same_thread": False}
-)
-TestingSessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
-
-
-@pytest.fixture
-def test_db():
-    """Create test database."""
-    Base.metadata.create_all(bind=engine)
-    db = TestingSessionLocal()
-    try:
-        yield db
-    finally:
-        db.close()
-        Base.metadata.drop_all(bind=engine)
-
-
 @pytest.fixture
-def test_client(test_db, tmp_path):
+def test_client(db_session, tmp_path, monkeypatch):
     """Create test client with temporary artifacts directory."""
     def override_get_db():
-        try:
-            yield test_db
-        finally:
-            pass
+        yield db_session
     
-    # Override settings for testing
-    from app.config import settings
-    settings.ARTIFACTS_PATH = str(tmp_path / "test_artifacts")
+    # Point artifact storage at a temporary directory
+    monkeypatch.setattr(artifacts_router, "ARTIFACTS_DIR", tmp_path / "test_artifacts")
     
     app.dependency_overrides[get_db] = override_get_db
     client = TestClient(app)
@@ -51,16 +26,15 @@ def test_client(test_db, tmp_path):
 
 
 @pytest.fixture
-def sample_experiment(test_db):
+def sample_experiment(db_session):
     """Create a sample experiment for testing."""
     experiment = Experiment(
         name="Test Experiment",
-        description="For testing purposes",
         hyperparameters={"lr": 0.001, "batch_size": 32}
     )
-    test_db.add(experiment)
-    test_db.commit()
-    test_db.refresh(experiment)
+    db_session.add(experiment)
+    db_session.commit()
+    db_session.refresh(experiment)
     return experiment
 
 
@@ -95,14 +69,12 @@ def test_create_experiment(test_client):
         "/experiments",
         json={
             "name": "CNN Training",
-            "description": "Image classification model",
             "hyperparameters": {"lr": 0.001, "epochs": 10}
         }
     )
     assert response.status_code == 201
     data = response.json()
     assert data["name"] == "CNN Training"
-    assert data["description"] == "Image classification model"
     assert data["hyperparameters"]["lr"] == 0.001
     assert data["status"] == "running"
     assert "id" in data
@@ -128,7 +100,7 @@ def test_list_experiments_pagination(test_client, sample_experiment):
         )
     
     # Test pagination
-    response = test_client.get("/experiments?skip=0&limit=2")
+    response = test_client.get("/experiments?page=1&size=2")
     assert response.status_code == 200
     assert len(response.json()) == 2
 
@@ -200,9 +172,9 @@ def test_log_single_metric(test_client, sample_experiment):
             "value": 0.5
         }
     )
-    assert response.status_code == 201
+    assert response.status_code == 200
     data = response.json()
-    assert data["logged"] == 1
+    assert data["count"] == 1
 
 
 def test_log_batch_metrics(test_client, sample_experiment):
@@ -218,9 +190,9 @@ def test_log_batch_metrics(test_client, sample_experiment):
             ]
         }
     )
-    assert response.status_code == 201
+    assert response.status_code == 200
     data = response.json()
-    assert data["logged"] == 4
+    assert data["count"] == 4
 
 
 def test_log_metric_invalid_value(test_client, sample_experiment):
@@ -272,7 +244,7 @@ def test_query_metrics_filter_by_name(test_client, sample_experiment):
     
     # Filter by name
     response = test_client.get(
-        f"/experiments/{sample_experiment.id}/metrics?name=loss"
+        f"/experiments/{sample_experiment.id}/metrics?metric_name=loss"
     )
     assert response.status_code == 200
     data = response.json()
@@ -301,10 +273,10 @@ def test_get_metrics_summary(test_client, sample_experiment):
     assert response.status_code == 200
     data = response.json()
     assert len(data) == 1
-    assert data[0]["name"] == "loss"
+    assert data[0]["metric_name"] == "loss"
     assert data[0]["min"] == 0.3
     assert data[0]["max"] == 0.5
-    assert data[0]["latest_value"] == 0.4
+    assert data[0]["latest"] == 0.4
     assert "mean" in data[0]
 
 
@@ -403,10 +375,12 @@ def test_download_file(test_client, sample_experiment):
     )
     artifact_id = upload_response.json()["id"]
     
-    # Download
-    download_response = test_client.get(f"/artifacts/{artifact_id}/download")
-    assert download_response.status_code == 200
-    assert download_response.content == file_content
+    # Download, reading the body as a stream rather than all at once
+    with test_client.stream("GET", f"/artifacts/{artifact_id}/download") as download_response:
+        assert download_response.status_code == 200
+        assert download_response.headers["content-length"] == str(len(file_content))
+        body = b"".join(download_response.iter_bytes(8192))
+    assert body == file_content
 
 
 def test_download_file_not_found(test_client):
@@ -1,56 +1,19 @@
-import pytest
-from fastapi.testclient import TestClient
-from sqlalchemy import create_engine
-from sqlalchemy.orm import sessionmaker
-from sqlalchemy.pool import StaticPool
-from uuid import UUID
-
-from app.main import app
-from app.database import Base, get_db
-
-# Create in-memory SQLite database for testing
-SQLALCHEMY_DATABASE_URL = "sqlite:///:memory:"
-
-engine = create_engine(
-    SQLALCHEMY_DATABASE_URL,
-    connect_args={"check_same_thread": False},
-    poolclass=StaticPool,
-)
-TestingSessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
-
+import re
 
-def override_get_db():
-    """Override database dependency for testing"""
-    try:
-        db = TestingSessionLocal()
-        yield db
-    finally:
-        db.close()
-
-
-@pytest.fixture(scope="function")
-def test_db():
-    """Create fresh database for each test"""
-    Base.metadata.create_all(bind=engine)
-    yield
-    Base.metadata.drop_all(bind=engine)
+import pytest
 
+pytestmark = pytest.mark.anyio
 
-@pytest.fixture
-def client(test_db):
-    """Test client with database override"""
-    app.dependency_overrides[get_db] = override_get_db
-    with TestClient(app) as c:
-        yield c
-    app.dependency_overrides.clear()
+# RFC 4122 version 4: version nibble 4, variant bits 10
+_UUID_RE = re.compile(r"^[0-9a-f]{8}-[0-9a-f]{4}-4[0-9a-f]{3}-[89ab][0-9a-f]{3}-[0-9a-f]{12}$", re.I)
 
 
 class TestExperimentCreation:
     """Test experiment creation endpoint"""
     
-    def test_create_experiment_minimal(self, client):
+    async def test_create_experiment_minimal(self, client):
         """Test creating experiment with minimal data"""
-        response = client.post(
+        response = await client.post(
             "/experiments",
             json={"name": "Test Experiment"}
         )
@@ -64,11 +27,11 @@ class TestExperimentCreation:
         assert "created_at" in data
         
         # Verify UUID format
-        UUID(data["id"])
+        assert _UUID_RE.match(data["id"])
     
-    def test_create_experiment_with_hyperparameters(self, client):
+    async def test_create_experiment_with_hyperparameters(self, client):
         """Test creating experiment with hyperparameters"""
-        response = client.post(
+        response = await client.post(
             "/experiments",
             json={
                 "name": "CNN Training",
@@ -87,229 +50,235 @@ class TestExperimentCreation:
         assert data["hyperparameters"]["batch_size"] == 32
         assert data["hyperparameters"]["epochs"] == 100
     
-    def test_create_experiment_name_too_long(self, client):
-        """Test validation for name length"""
-        long_name = "A" * 201
-        response = client.post(
-            "/experiments",
-            json={"name": long_name}
-        )
-        assert response.status_code == 422
-    
-    def test_create_experiment_missing_name(self, client):
-        """Test validation for missing name"""
-        response = client.post(
-            "/experiments",
-            json={}
-        )
+    @pytest.mark.parametrize("payload", [
+        {"name": "A" * 201},
+        {},
+    ], ids=["name_too_long", "missing_name"])
+    async def test_create_experiment_invalid(self, client, payload):
+        """Test validation for name length and presence"""
+        response = await client.post("/experiments", json=payload)
         assert response.status_code == 422
 
 
 class TestExperimentRetrieval:
     """Test experiment retrieval endpoints"""
     
-    def test_get_experiment_by_id(self, client):
+    async def test_get_experiment_by_id(self, client, seed_experiments):
         """Test getting a single experiment"""
-        # Create experiment
-        create_response = client.post(
-            "/experiments",
-            json={"name": "Test Experiment"}
-        )
-        experiment_id = create_response.json()["id"]
+        experiment_id = str(seed_experiments(1)[0].id)
         
-        # Get experiment
-        response = client.get(f"/experiments/{experiment_id}")
+        response = await client.get(f"/experiments/{experiment_id}")
         assert response.status_code == 200
         data = response.json()
         
         assert data["id"] == experiment_id
-        assert data["name"] == "Test Experiment"
+        assert data["name"] == "Experiment 0"
     
-    def test_get_nonexistent_experiment(self, client):
+    async def test_get_nonexistent_experiment(self, client):
         """Test 404 for nonexistent experiment"""
         fake_uuid = "123e4567-e89b-12d3-a456-426614174000"
-        response = client.get(f"/experiments/{fake_uuid}")
+        response = await client.get(f"/experiments/{fake_uuid}")
         assert response.status_code == 404
         assert "not found" in response.json()["detail"].lower()
     
-    def test_get_experiment_invalid_uuid(self, client):
+    async def test_get_experiment_invalid_uuid(self, client):
         """Test 422 for invalid UUID format"""
-        response = client.get("/experiments/invalid-uuid")
+        response = await client.get("/experiments/invalid-uuid")
         assert response.status_code == 422
 
 
 class TestExperimentListing:
     """Test experiment listing with pagination and filters"""
     
-    def test_list_experiments_empty(self, client):
+    async def test_list_experiments_empty(self, client):
         """Test listing when no experiments exist"""
-        response = client.get("/experiments")
+        response = await client.get("/experiments")
         assert response.status_code == 200
         assert response.json() == []
     
-    def test_list_experiments(self, client):
+    async def test_list_experiments(self, client, seed_experiments):
         """Test listing experiments"""
-        # Create multiple experiments
-        for i in range(3):
-            client.post("/experiments", json={"name": f"Experiment {i}"})
+        seed_experiments(3)
         
-        response = client.get("/experiments")
+        response = await client.get("/experiments")
         assert response.status_code == 200
         data = response.json()
         
         assert len(data) == 3
         assert all("id" in exp for exp in data)
     
-    def test_list_experiments_pagination(self, client):
+    async def test_list_experiments_pagination(self, client, seed_experiments):
         """Test pagination"""
-        # Create 5 experiments
-        for i in range(5):
-            client.post("/experiments", json={"name": f"Experiment {i}"})
+        seed_experiments(5)
         
         # Get first page with size 2
-        response = client.get("/experiments?page=1&size=2")
+        response = await client.get("/experiments?page=1&size=2")
         assert response.status_code == 200
         assert len(response.json()) == 2
         
         # Get second page
-        response = client.get("/experiments?page=2&size=2")
+        response = await client.get("/experiments?page=2&size=2")
         assert response.status_code == 200
         assert len(response.json()) == 2
         
         # Get third page
-        response = client.get("/experiments?page=3&size=2")
+        response = await client.get("/experiments?page=3&size=2")
         assert response.status_code == 200
         assert len(response.json()) == 1
     
-    def test_list_experiments_filter_by_status(self, client):
-        """Test filtering by status"""
-        # Create experiments
-        exp1 = client.post("/experiments", json={"name": "Exp 1"}).json()
-        exp2 = client.post("/experiments", json={"name": "Exp 2"}).json()
+    async def test_list_experiments_total_count_header(self, client, seed_experiments):
+        """Test total count is reported independently of page size"""
+        seed_experiments(5)
         
-        # Update one to completed
-        client.put(
-            f"/experiments/{exp1['id']}/status",
-            json={"status": "completed"}
-        )
+        response = await client.get("/experiments?page=1&size=2")
+        assert response.status_code == 200
+        assert len(response.json()) == 2
+        assert response.headers["X-Total-Count"] == "5"
+    
+    async def test_list_experiments_filter_by_status(self, client, seed_experiments):
+        """Test filtering by status"""
+        seed_experiments(1)
+        seed_experiments(1, status="completed")
         
         # Filter by running
-        response = client.get("/experiments?status=running")
+        response = await client.get("/experiments?status=running")
         assert response.status_code == 200
         data = response.json()
         assert len(data) == 1
         assert data[0]["status"] == "running"
         
         # Filter by completed
-        response = client.get("/experiments?status=completed")
+        response = await client.get("/experiments?status=completed")
         assert response.status_code == 200
         data = response.json()
         assert len(data) == 1
         assert data[0]["status"] == "completed"
     
-    def test_list_experiments_invalid_status(self, client):
+    async def test_list_experiments_filter_by_tag(self, client, seed_experiments):
+        """Test filtering by tag matches whole tags only"""
+        seed_experiments(2, tags=["pytorch", "baseline"])
+        seed_experiments(1, tags=["tensorflow"])
+        seed_experiments(1, tags=["pytorch-lightning"])
+        
+        response = await client.get("/experiments?tag=pytorch")
+        assert response.status_code == 200
+        data = response.json()
+        assert len(data) == 2
+        assert all("pytorch" in exp["tags"] for exp in data)
+        assert response.headers["X-Total-Count"] == "2"
+        
+        response = await client.get("/experiments?tag=pytorch&status=completed")
+        assert response.status_code == 200
+        assert response.json() == []
+    
+    async def test_list_experiments_invalid_status(self, client):
         """Test validation for invalid status filter"""
-        response = client.get("/experiments?status=invalid")
+        response = await client.get("/experiments?status=invalid")
         assert response.status_code == 422
     
-    def test_list_experiments_pagination_limits(self, client):
+    async def test_list_experiments_pagination_limits(self, client):
         """Test pagination parameter validation"""
         # Invalid page number
-        response = client.get("/experiments?page=0")
+        response = await client.get("/experiments?page=0")
         assert response.status_code == 422
         
         # Size too large
-        response = client.get("/experiments?size=101")
+        response = await client.get("/experiments?size=101")
         assert response.status_code == 422
 
 
 class TestExperimentStatusUpdate:
     """Test experiment status update endpoint"""
     
-    def test_update_status_to_completed(self, client):
-        """Test updating status to completed"""
-        # Create experiment
-        create_response = client.post(
-            "/experiments",
-            json={"name": "Test Experiment"}
-        )
-        experiment_id = create_response.json()["id"]
+    @pytest.mark.parametrize("status,expected", [
+        ("completed", 200),
+        ("failed", 200),
+        ("invalid", 422),
+    ])
+    async def test_update_status(self, client, seed_experiments, status, expected):
+        """Test updating status to each terminal value, and rejecting others"""
+        experiment_id = str(seed_experiments(1)[0].id)
         
-        # Update status
-        response = client.put(
+        response = await client.put(
             f"/experiments/{experiment_id}/status",
-            json={"status": "completed"}
+            json={"status": status}
         )
-        assert response.status_code == 200
-        data = response.json()
-        
-        assert data["status"] == "completed"
-        assert data["id"] == experiment_id
+        assert response.status_code == expected
+        if expected == 200:
+            data = response.json()
+            assert data["status"] == status
+            assert data["id"] == experiment_id
     
-    def test_update_status_to_failed(self, client):
-        """Test updating status to failed"""
-        create_response = client.post(
-            "/experiments",
-            json={"name": "Test Experiment"}
+    async def test_update_status_nonexistent_experiment(self, client):
+        """Test 404 for updating nonexistent experiment"""
+        fake_uuid = "123e4567-e89b-12d3-a456-426614174000"
+        response = await client.put(
+            f"/experiments/{fake_uuid}/status",
+            json={"status": "completed"}
         )
-        experiment_id = create_response.json()["id"]
+        assert response.status_code == 404
+
+
+class TestExperimentTags:
+    """Test experiment tags update endpoint"""
+    
+    async def test_update_tags(self, client, seed_experiments):
+        """Test tags are replaced and then used by the tag filter"""
+        experiment_id = str(seed_experiments(1, tags=["draft"])[0].id)
         
-        response = client.put(
-            f"/experiments/{experiment_id}/status",
-            json={"status": "failed"}
+        response = await client.put(
+            f"/experiments/{experiment_id}/tags",
+            json={"tags": ["production", "best-model"]}
         )
         assert response.status_code == 200
-        assert response.json()["status"] == "failed"
-    
-    def test_update_status_invalid_value(self, client):
-        """Test validation for invalid status"""
-        create_response = client.post(
-            "/experiments",
-            json={"name": "Test Experiment"}
-        )
-        experiment_id = create_response.json()["id"]
+        assert response.json()["tags"] == ["production", "best-model"]
         
-        response = client.put(
-            f"/experiments/{experiment_id}/status",
-            json={"status": "invalid"}
-        )
-        assert response.status_code == 422
+        response = await client.get("/experiments?tag=production")
+        assert [exp["id"] for exp in response.json()] == [experiment_id]
+        response = await client.get("/experiments?tag=draft")
+        assert response.json() == []
     
-    def test_update_status_nonexistent_experiment(self, client):
-        """Test 404 for updating nonexistent experiment"""
+    async def test_update_tags_nonexistent_experiment(self, client):
+        """Test 404 for updating tags of nonexistent experiment"""
         fake_uuid = "123e4567-e89b-12d3-a456-426614174000"
-        response = client.put(
-            f"/experiments/{fake_uuid}/status",
-            json={"status": "completed"}
+        response = await client.put(
+            f"/experiments/{fake_uuid}/tags",
+            json={"tags": ["production"]}
         )
         assert response.status_code == 404
+    
+    async def test_update_tags_requires_list(self, client, seed_experiments):
+        """Test 422 when tags are missing"""
+        experiment_id = str(seed_experiments(1)[0].id)
+        response = await client.put(f"/experiments/{experiment_id}/tags", json={})
+        assert response.status_code == 422
 
 
 class TestExperimentComparison:
     """Test experiment comparison endpoint"""
     
-    def test_compare_experiments(self, client):
+    async def test_compare_experiments(self, client):
         """Test comparing multiple experiments"""
         # Create experiments with different hyperparameters
-        exp1 = client.post(
+        exp1 = (await client.post(
             "/experiments",
             json={
                 "name": "Experiment 1",
                 "hyperparameters": {"learning_rate": 0.001, "batch_size": 32}
             }
-        ).json()
+        )).json()
         
-        exp2 = client.post(
+        exp2 = (await client.post(
             "/experiments",
             json={
                 "name": "Experiment 2",
                 "hyperparameters": {"learning_rate": 0.01, "batch_size": 64}
             }
-        ).json()
+        )).json()
         
         # Compare experiments
         ids = f"{exp1['id']},{exp2['id']}"
-        response = client.get(f"/experiments/compare?ids={ids}")
+        response = await client.get(f"/experiments/compare?ids={ids}")
         
         assert response.status_code == 200
         data = response.json()
@@ -318,40 +287,47 @@ class TestExperimentComparison:
         assert data[0]["hyperparameters"]["learning_rate"] == 0.001
         assert data[1]["hyperparameters"]["learning_rate"] == 0.01
     
-    def test_compare_single_experiment(self, client):
+    async def test_compare_single_experiment(self, client):
         """Test comparing with single ID"""
-        exp = client.post(
+        exp = (await client.post(
             "/experiments",
             json={"name": "Test Experiment"}
-        ).json()
+        )).json()
         
-        response = client.get(f"/experiments/compare?ids={exp['id']}")
+        response = await client.get(f"/experiments/compare?ids={exp['id']}")
         assert response.status_code == 200
         assert len(response.json()) == 1
     
-    def test_compare_invalid_uuid(self, client):
+    async def test_compare_invalid_uuid(self, client):
         """Test 400 for invalid UUID format"""
-        response = client.get("/experiments/compare?ids=invalid-uuid")
+        response = await client.get("/experiments/compare?ids=invalid-uuid")
         assert response.status_code == 400
         assert "invalid uuid" in response.json()["detail"].lower()
     
-    def test_compare_nonexistent_experiments(self, client):
+    async def test_compare_too_many_ids(self, client):
+        """Test 400 when more than 100 IDs are requested"""
+        ids = ",".join(["123e4567-e89b-12d3-a456-426614174000"] * 101)
+        response = await client.get(f"/experiments/compare?ids={ids}")
+        assert response.status_code == 400
+        assert "at most 100" in response.json()["detail"].lower()
+    
+    async def test_compare_nonexistent_experiments(self, client):
         """Test 404 when no experiments found"""
         fake_uuid = "123e4567-e89b-12d3-a456-426614174000"
-        response = client.get(f"/experiments/compare?ids={fake_uuid}")
+        response = await client.get(f"/experiments/compare?ids={fake_uuid}")
         assert response.status_code == 404
     
-    def test_compare_mixed_valid_invalid_ids(self, client):
+    async def test_compare_mixed_valid_invalid_ids(self, client):
         """Test with mix of valid and invalid IDs"""
-        exp = client.post(
+        exp = (await client.post(
             "/experiments",
             json={"name": "Test Experiment"}
-        ).json()
+        )).json()
         
         fake_uuid = "123e4567-e89b-12d3-a456-426614174000"
         ids = f"{exp['id']},{fake_uuid}"
         
-        response = client.get(f"/experiments/compare?ids={ids}")
+        response = await client.get(f"/experiments/compare?ids={ids}")
         assert response.status_code == 200
         # Should only return the one that exists
         assert len(response.json()) == 1
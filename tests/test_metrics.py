@@ -1,67 +1,34 @@
 import pytest
-from fastapi.testclient import TestClient
-from sqlalchemy import create_engine
-from sqlalchemy.orm import sessionmaker
-from sqlalchemy.pool import StaticPool
-from uuid import UUID
+import json
 import math
+from functools import cache
+from itertools import pairwise
 
-from app.main import app
-from app.database import Base, get_db
+pytestmark = pytest.mark.anyio
 
-# Create in-memory SQLite database for testing
-SQLALCHEMY_DATABASE_URL = "sqlite:///:memory:"
+JSON_HEADERS = {"content-type": "application/json"}
 
-engine = create_engine(
-    SQLALCHEMY_DATABASE_URL,
-    connect_args={"check_same_thread": False},
-    poolclass=StaticPool,
-)
-TestingSessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
 
-
-def override_get_db():
-    """Override database dependency for testing"""
-    try:
-        db = TestingSessionLocal()
-        yield db
-    finally:
-        db.close()
-
-
-@pytest.fixture(scope="function")
-def test_db():
-    """Create fresh database for each test"""
-    Base.metadata.create_all(bind=engine)
-    yield
-    Base.metadata.drop_all(bind=engine)
-
-
-@pytest.fixture
-def client(test_db):
-    """Test client with database override"""
-    app.dependency_overrides[get_db] = override_get_db
-    with TestClient(app) as c:
-        yield c
-    app.dependency_overrides.clear()
-
-
-@pytest.fixture
-def experiment(client):
-    """Create a test experiment"""
-    response = client.post(
-        "/experiments",
-        json={"name": "Test Experiment"}
-    )
-    return response.json()
+@pytest.fixture(scope="module")
+def batch_json():
+    """Serialized `{"metrics": [...]}` bodies of n loss rows, built once per size"""
+    @cache
+    def build(n):
+        metrics = [
+            {"step": i, "metric_name": "loss", "value": 0.5}
+            for i in range(n)
+        ]
+        return json.dumps({"metrics": metrics}).encode()
+    
+    return build
 
 
 class TestMetricLogging:
     """Test metric logging endpoint"""
     
-    def test_log_single_metric(self, client, experiment):
+    async def test_log_single_metric(self, client, experiment):
         """Test logging a single metric"""
-        response = client.post(
+        response = await client.post(
             f"/experiments/{experiment['id']}/metrics",
             json={
                 "step": 0,
@@ -75,14 +42,14 @@ class TestMetricLogging:
         assert data["count"] == 1
         assert "Successfully logged 1 metric" in data["message"]
     
-    def test_log_batch_metrics(self, client, experiment):
+    async def test_log_batch_metrics(self, client, experiment):
         """Test logging batch of metrics"""
         metrics = [
             {"step": i, "metric_name": "loss", "value": 1.0 - (i * 0.01)}
             for i in range(100)
         ]
         
-        response = client.post(
+        response = await client.post(
             f"/experiments/{experiment['id']}/metrics",
             json={"metrics": metrics}
         )
@@ -92,36 +59,28 @@ class TestMetricLogging:
         assert data["count"] == 100
         assert "Successfully logged 100 metric" in data["message"]
     
-    def test_log_metrics_max_batch_size(self, client, experiment):
+    async def test_log_metrics_max_batch_size(self, client, experiment, batch_json):
         """Test maximum batch size of 1000"""
-        metrics = [
-            {"step": i, "metric_name": "loss", "value": 0.5}
-            for i in range(1000)
-        ]
-        
-        response = client.post(
+        response = await client.post(
             f"/experiments/{experiment['id']}/metrics",
-            json={"metrics": metrics}
+            content=batch_json(1000),
+            headers=JSON_HEADERS
         )
         assert response.status_code == 200
         assert response.json()["count"] == 1000
     
-    def test_log_metrics_exceeds_max_batch(self, client, experiment):
+    async def test_log_metrics_exceeds_max_batch(self, client, experiment, batch_json):
         """Test validation for batch size > 1000"""
-        metrics = [
-            {"step": i, "metric_name": "loss", "value": 0.5}
-            for i in range(1001)
-        ]
-        
-        response = client.post(
+        response = await client.post(
             f"/experiments/{experiment['id']}/metrics",
-            json={"metrics": metrics}
+            content=batch_json(1001),
+            headers=JSON_HEADERS
         )
         assert response.status_code == 422
     
-    def test_log_metric_negative_step(self, client, experiment):
+    async def test_log_metric_negative_step(self, client, experiment):
         """Test validation for negative step"""
-        response = client.post(
+        response = await client.post(
             f"/experiments/{experiment['id']}/metrics",
             json={
                 "step": -1,
@@ -131,34 +90,30 @@ class TestMetricLogging:
         )
         assert response.status_code == 422
     
-    def test_log_metric_nan_value(self, client, experiment):
-        """Test validation for NaN value"""
-        response = client.post(
-            f"/experiments/{experiment['id']}/metrics",
-            json={
-                "step": 0,
-                "metric_name": "loss",
-                "value": float('nan')
-            }
-        )
-        assert response.status_code == 422
-    
-    def test_log_metric_infinity_value(self, client, experiment):
-        """Test validation for infinity value"""
-        response = client.post(
+    @pytest.mark.parametrize("value", [
+        float("nan"),
+        float("inf"),
+        float("-inf"),
+        1e39,  # Outside single precision
+        1e-50,  # Underflows single precision
+        -1e-50,
+    ], ids=["nan", "inf", "-inf", "exceeds_float32", "underflows_float32", "-underflows_float32"])
+    async def test_log_metric_invalid_value(self, client, experiment, value):
+        """Test validation for values that cannot be stored"""
+        response = await client.post(
             f"/experiments/{experiment['id']}/metrics",
             json={
                 "step": 0,
                 "metric_name": "loss",
-                "value": float('inf')
+                "value": value
             }
         )
         assert response.status_code == 422
     
-    def test_log_metric_nonexistent_experiment(self, client):
+    async def test_log_metric_nonexistent_experiment(self, client):
         """Test 404 for nonexistent experiment"""
         fake_uuid = "123e4567-e89b-12d3-a456-426614174000"
-        response = client.post(
+        response = await client.post(
             f"/experiments/{fake_uuid}/metrics",
             json={
                 "step": 0,
@@ -169,7 +124,7 @@ class TestMetricLogging:
         assert response.status_code == 404
         assert "not found" in response.json()["detail"].lower()
     
-    def test_log_multiple_metric_types(self, client, experiment):
+    async def test_log_multiple_metric_types(self, client, experiment):
         """Test logging different metric types"""
         metrics = [
             {"step": 0, "metric_name": "loss", "value": 0.5},
@@ -177,46 +132,72 @@ class TestMetricLogging:
             {"step": 0, "metric_name": "f1_score", "value": 0.75},
         ]
         
-        response = client.post(
+        response = await client.post(
             f"/experiments/{experiment['id']}/metrics",
             json={"metrics": metrics}
         )
         assert response.status_code == 200
         assert response.json()["count"] == 3
+    
+    async def test_log_metrics_retry_is_idempotent(self, client, experiment):
+        """Test re-sending a batch does not store duplicate points"""
+        url = f"/experiments/{experiment['id']}/metrics"
+        batch = {"metrics": [
+            {"step": 0, "metric_name": "loss", "value": 0.5},
+            {"step": 1, "metric_name": "loss", "value": 0.4},
+        ]}
+        
+        assert (await client.post(url, json=batch)).json()["count"] == 2
+        assert (await client.post(url, json=batch)).json()["count"] == 0
+        
+        assert len((await client.get(url)).json()) == 2
+        assert (await client.get(f"{url}/summary")).json()[0]["count"] == 2
+    
+    async def test_log_metrics_duplicate_in_batch_keeps_last(self, client, experiment):
+        """Test a point repeated within one batch is stored once, with its last value"""
+        url = f"/experiments/{experiment['id']}/metrics"
+        response = await client.post(url, json={"metrics": [
+            {"step": 3, "metric_name": "loss", "value": 0.9},
+            {"step": 3, "metric_name": "loss", "value": 0.7},
+        ]})
+        assert response.json()["count"] == 1
+        
+        data = (await client.get(url)).json()
+        assert len(data) == 1
+        assert data[0]["value"] == 0.7
 
 
 class TestMetricRetrieval:
     """Test metric retrieval endpoint"""
     
-    def test_get_all_metrics(self, client, experiment):
+    async def test_get_all_metrics(self, client, experiment):
         """Test getting all metrics"""
         # Log some metrics
         metrics = [
             {"step": i, "metric_name": "loss", "value": 1.0 - (i * 0.01)}
             for i in range(10)
         ]
-        client.post(
+        await client.post(
             f"/experiments/{experiment['id']}/metrics",
             json={"metrics": metrics}
         )
         
         # Get metrics
-        response = client.get(f"/experiments/{experiment['id']}/metrics")
+        response = await client.get(f"/experiments/{experiment['id']}/metrics")
         assert response.status_code == 200
         data = response.json()
         
         assert len(data) == 10
-        assert all("step" in m for m in data)
-        assert all("metric_name" in m for m in data)
-        assert all("value" in m for m in data)
+        for m in data:
+            assert {"step", "metric_name", "value"} <= m.keys()
     
-    def test_get_metrics_empty(self, client, experiment):
+    async def test_get_metrics_empty(self, client, readonly_experiment):
         """Test getting metrics when none exist"""
-        response = client.get(f"/experiments/{experiment['id']}/metrics")
+        response = await client.get(f"/experiments/{readonly_experiment['id']}/metrics")
         assert response.status_code == 200
         assert response.json() == []
     
-    def test_get_metrics_filter_by_name(self, client, experiment):
+    async def test_get_metrics_filter_by_name(self, client, experiment):
         """Test filtering metrics by name"""
         # Log different metrics
         metrics = [
@@ -225,72 +206,75 @@ class TestMetricRetrieval:
             {"step": 1, "metric_name": "loss", "value": 0.4},
             {"step": 1, "metric_name": "accuracy", "value": 0.87},
         ]
-        client.post(
+        await client.post(
             f"/experiments/{experiment['id']}/metrics",
             json={"metrics": metrics}
         )
         
         # Filter by loss
-        response = client.get(
+        response = await client.get(
             f"/experiments/{experiment['id']}/metrics?metric_name=loss"
         )
         assert response.status_code == 200
         data = response.json()
         
-        assert len(data) == 2
-        assert all(m["metric_name"] == "loss" for m in data)
+        assert [m["metric_name"] for m in data] == ["loss", "loss"]
     
-    def test_get_metrics_pagination(self, client, experiment):
+    async def test_get_metrics_pagination(self, client, experiment, seed_metrics):
         """Test pagination with limit and offset"""
-        # Log 50 metrics
-        metrics = [
-            {"step": i, "metric_name": "loss", "value": 0.5}
-            for i in range(50)
-        ]
-        client.post(
-            f"/experiments/{experiment['id']}/metrics",
-            json={"metrics": metrics}
-        )
+        seed_metrics(experiment["id"], 50)
         
         # Get first 10
-        response = client.get(
+        response = await client.get(
             f"/experiments/{experiment['id']}/metrics?limit=10&offset=0"
         )
         assert response.status_code == 200
         assert len(response.json()) == 10
         
         # Get next 10
-        response = client.get(
+        response = await client.get(
             f"/experiments/{experiment['id']}/metrics?limit=10&offset=10"
         )
         assert response.status_code == 200
         assert len(response.json()) == 10
         
         # Get last 10
-        response = client.get(
+        response = await client.get(
             f"/experiments/{experiment['id']}/metrics?limit=10&offset=40"
         )
         assert response.status_code == 200
         assert len(response.json()) == 10
     
-    def test_get_metrics_default_limit(self, client, experiment):
+    async def test_get_metrics_default_limit(self, client, experiment, seed_metrics):
         """Test default limit of 1000"""
-        # Log 1500 metrics
+        # 1500 rows is over the 1000-row batch cap, so insert them directly
+        seed_metrics(experiment["id"], 1500)
+        
+        # Get without limit (should default to 1000)
+        response = await client.get(f"/experiments/{experiment['id']}/metrics")
+        assert response.status_code == 200
+        assert len(response.json()) == 1000
+    
+    async def test_get_metrics_gzip_compressed(self, client, experiment):
+        """Test large metric responses are gzip-encoded on the wire"""
         metrics = [
-            {"step": i, "metric_name": "loss", "value": 0.5}
-            for i in range(1500)
+            {"step": i, "metric_name": "loss", "value": 1.0 / (i + 1)}
+            for i in range(100)
         ]
-        client.post(
+        await client.post(
             f"/experiments/{experiment['id']}/metrics",
             json={"metrics": metrics}
         )
         
-        # Get without limit (should default to 1000)
-        response = client.get(f"/experiments/{experiment['id']}/metrics")
+        response = await client.get(
+            f"/experiments/{experiment['id']}/metrics",
+            headers={"Accept-Encoding": "gzip"}
+        )
         assert response.status_code == 200
-        assert len(response.json()) == 1000
+        assert response.headers["content-encoding"] == "gzip"
+        assert len(response.json()) == 100
     
-    def test_get_metrics_ordered_by_step(self, client, experiment):
+    async def test_get_metrics_ordered_by_step(self, client, experiment):
         """Test metrics are ordered by step"""
         # Log in random order
         metrics = [
@@ -298,28 +282,112 @@ class TestMetricRetrieval:
             {"step": 1, "metric_name": "loss", "value": 0.9},
             {"step": 3, "metric_name": "loss", "value": 0.7},
         ]
-        client.post(
+        await client.post(
             f"/experiments/{experiment['id']}/metrics",
             json={"metrics": metrics}
         )
         
-        response = client.get(f"/experiments/{experiment['id']}/metrics")
+        response = await client.get(f"/experiments/{experiment['id']}/metrics")
         data = response.json()
         
-        steps = [m["step"] for m in data]
-        assert steps == sorted(steps)
+        assert all(a <= b for a, b in pairwise(m["step"] for m in data))
+    
+    async def test_get_metrics_nonexistent_experiment(self, client):
+        """Test 404 for nonexistent experiment"""
+        fake_uuid = "123e4567-e89b-12d3-a456-426614174000"
+        response = await client.get(f"/experiments/{fake_uuid}/metrics")
+        assert response.status_code == 404
+
+
+class TestMetricColumns:
+    """Test columnar metric retrieval"""
+    
+    async def test_get_metric_columns(self, client, experiment):
+        """Test parallel arrays are ordered by step and aligned"""
+        metrics = [
+            {"step": 2, "metric_name": "loss", "value": 0.7},
+            {"step": 0, "metric_name": "loss", "value": 0.9},
+            {"step": 1, "metric_name": "accuracy", "value": 0.6},
+        ]
+        await client.post(
+            f"/experiments/{experiment['id']}/metrics",
+            json={"metrics": metrics}
+        )
+        
+        response = await client.get(f"/experiments/{experiment['id']}/metrics/columns")
+        assert response.status_code == 200
+        assert response.json() == {
+            "step": [0, 1, 2],
+            "metric_name": ["loss", "accuracy", "loss"],
+            "value": [0.9, 0.6, 0.7]
+        }
+    
+    async def test_get_metric_columns_empty(self, client, readonly_experiment):
+        """Test an experiment without metrics returns empty arrays"""
+        response = await client.get(f"/experiments/{readonly_experiment['id']}/metrics/columns")
+        assert response.status_code == 200
+        assert response.json() == {"step": [], "metric_name": [], "value": []}
     
-    def test_get_metrics_nonexistent_experiment(self, client):
+    async def test_get_metric_columns_nonexistent_experiment(self, client):
         """Test 404 for nonexistent experiment"""
         fake_uuid = "123e4567-e89b-12d3-a456-426614174000"
-        response = client.get(f"/experiments/{fake_uuid}/metrics")
+        response = await client.get(f"/experiments/{fake_uuid}/metrics/columns")
+        assert response.status_code == 404
+
+
+class TestMetricStreaming:
+    """Test ND-JSON metric streaming endpoint"""
+    
+    async def test_stream_metrics(self, client, experiment):
+        """Test streaming returns one JSON object per line, ordered by step"""
+        metrics = [
+            {"step": 2, "metric_name": "loss", "value": 0.7},
+            {"step": 0, "metric_name": "loss", "value": 0.9},
+            {"step": 1, "metric_name": "accuracy", "value": 0.6},
+        ]
+        await client.post(
+            f"/experiments/{experiment['id']}/metrics",
+            json={"metrics": metrics}
+        )
+        
+        response = await client.get(f"/experiments/{experiment['id']}/metrics/stream")
+        assert response.status_code == 200
+        assert response.headers["content-type"] == "application/x-ndjson"
+        
+        rows = [json.loads(line) for line in response.text.splitlines()]
+        assert [r["step"] for r in rows] == [0, 1, 2]
+        assert rows[0]["experiment_id"] == experiment["id"]
+    
+    async def test_stream_metrics_filter_by_name(self, client, experiment):
+        """Test streaming with metric name filter"""
+        metrics = [
+            {"step": 0, "metric_name": "loss", "value": 0.9},
+            {"step": 0, "metric_name": "accuracy", "value": 0.6},
+        ]
+        await client.post(
+            f"/experiments/{experiment['id']}/metrics",
+            json={"metrics": metrics}
+        )
+        
+        response = await client.get(
+            f"/experiments/{experiment['id']}/metrics/stream?metric_name=loss"
+        )
+        assert response.status_code == 200
+        rows = [json.loads(line) for line in response.text.splitlines()]
+        assert len(rows) == 1
+        assert rows[0]["metric_name"] == "loss"
+    
+    async def test_stream_metrics_nonexistent_experiment(self, client):
+        """Test 404 for nonexistent experiment"""
+        fake_uuid = "123e4567-e89b-12d3-a456-426614174000"
+        response = await client.get(f"/experiments/{fake_uuid}/metrics/stream")
         assert response.status_code == 404
 
 
 class TestMetricSummary:
     """Test metric summary endpoint"""
     
-    def test_get_metrics_summary(self, client, experiment):
+    async def test_get_metrics_summary(self, client, experiment):
         """Test getting metric summary statistics"""
         # Log metrics with known values
         metrics = [
@@ -327,12 +395,12 @@ class TestMetricSummary:
             for i in range(5)
         ]  # Values: 1, 2, 3, 4, 5
         
-        client.post(
+        await client.post(
             f"/experiments/{experiment['id']}/metrics",
             json={"metrics": metrics}
         )
         
-        response = client.get(f"/experiments/{experiment['id']}/metrics/summary")
+        response = await client.get(f"/experiments/{experiment['id']}/metrics/summary")
         assert response.status_code == 200
         data = response.json()
         
@@ -346,7 +414,7 @@ class TestMetricSummary:
         assert summary["latest"] == 5.0  # Last value at step 4
         assert summary["count"] == 5
     
-    def test_get_metrics_summary_multiple_metrics(self, client, experiment):
+    async def test_get_metrics_summary_multiple_metrics(self, client, experiment):
         """Test summary with multiple metric types"""
         metrics = [
             # Loss metrics
@@ -359,20 +427,21 @@ class TestMetricSummary:
             {"step": 2, "metric_name": "accuracy", "value": 0.9},
         ]
         
-        client.post(
+        await client.post(
             f"/experiments/{experiment['id']}/metrics",
             json={"metrics": metrics}
         )
         
-        response = client.get(f"/experiments/{experiment['id']}/metrics/summary")
+        response = await client.get(f"/experiments/{experiment['id']}/metrics/summary")
         assert response.status_code == 200
         data = response.json()
         
         assert len(data) == 2
         
         # Find loss and accuracy summaries
-        loss_summary = next(m for m in data if m["metric_name"] == "loss")
-        acc_summary = next(m for m in data if m["metric_name"] == "accuracy")
+        by_name = {m["metric_name"]: m for m in data}
+        loss_summary = by_name["loss"]
+        acc_summary = by_name["accuracy"]
         
         # Verify loss
         assert loss_summary["min"] == 0.3
@@ -384,19 +453,19 @@ class TestMetricSummary:
         assert acc_summary["max"] == 0.9
         assert acc_summary["latest"] == 0.9
     
-    def test_get_metrics_summary_empty(self, client, experiment):
+    async def test_get_metrics_summary_empty(self, client, experiment):
         """Test summary when no metrics exist"""
-        response = client.get(f"/experiments/{experiment['id']}/metrics/summary")
+        response = await client.get(f"/experiments/{experiment['id']}/metrics/summary")
         assert response.status_code == 200
         assert response.json() == []
     
-    def test_get_metrics_summary_nonexistent_experiment(self, client):
+    async def test_get_metrics_summary_nonexistent_experiment(self, client):
         """Test 404 for nonexistent experiment"""
         fake_uuid = "123e4567-e89b-12d3-a456-426614174000"
-        response = client.get(f"/experiments/{fake_uuid}/metrics/summary")
+        response = await client.get(f"/experiments/{fake_uuid}/metrics/summary")
         assert response.status_code == 404
     
-    def test_get_metrics_summary_latest_value(self, client, experiment):
+    async def test_get_metrics_summary_latest_value(self, client, experiment):
         """Test that latest value is from highest step"""
         metrics = [
             {"step": 10, "metric_name": "loss", "value": 0.1},
@@ -404,22 +473,55 @@ class TestMetricSummary:
             {"step": 1, "metric_name": "loss", "value": 0.9},
         ]
         
-        client.post(
+        await client.post(
             f"/experiments/{experiment['id']}/metrics",
             json={"metrics": metrics}
         )
         
-        response = client.get(f"/experiments/{experiment['id']}/metrics/summary")
+        response = await client.get(f"/experiments/{experiment['id']}/metrics/summary")
         data = response.json()
         
         assert len(data) == 1
         assert data[0]["latest"] == 0.1  # From step 10
+    
+    async def test_get_metrics_summary_reflects_new_metrics(self, client, experiment):
+        """Test that a summary read again after more metrics are logged includes them"""
+        url = f"/experiments/{experiment['id']}/metrics"
+        await client.post(url, json={"step": 1, "metric_name": "loss", "value": 0.5})
+        
+        first = (await client.get(f"{url}/summary")).json()
+        assert first[0]["count"] == 1
+        
+        await client.post(url, json={"step": 2, "metric_name": "loss", "value": 0.3})
+        
+        second = (await client.get(f"{url}/summary")).json()
+        assert second[0]["count"] == 2
+        assert second[0]["latest"] == 0.3
+    
+    async def test_get_metrics_summary_across_batches(self, client, experiment):
+        """Test aggregates combine correctly over separately logged batches"""
+        url = f"/experiments/{experiment['id']}/metrics"
+        await client.post(url, json={"metrics": [
+            {"step": 10, "metric_name": "loss", "value": 0.2},
+            {"step": 11, "metric_name": "loss", "value": 0.4},
+        ]})
+        # An older step logged later must not replace the latest value
+        await client.post(url, json={"step": 3, "metric_name": "loss", "value": 0.9})
+        
+        data = (await client.get(f"{url}/summary")).json()
+        
+        assert len(data) == 1
+        assert data[0]["count"] == 3
+        assert data[0]["min"] == 0.2
+        assert data[0]["max"] == 0.9
+        assert data[0]["mean"] == pytest.approx(0.5)
+        assert data[0]["latest"] == 0.4
 
 
 class TestIntegration:
     """Integration tests for complete workflow"""
     
-    def test_complete_training_workflow(self, client, experiment):
+    async def test_complete_training_workflow(self, client, experiment):
         """Test complete training workflow with metrics"""
         exp_id = experiment["id"]
         
@@ -430,14 +532,14 @@ class TestIntegration:
                 {"step": epoch, "metric_name": "val_loss", "value": 1.0 - (epoch * 0.08)},
                 {"step": epoch, "metric_name": "accuracy", "value": 0.5 + (epoch * 0.05)},
             ]
-            response = client.post(
+            response = await client.post(
                 f"/experiments/{exp_id}/metrics",
                 json={"metrics": metrics}
             )
             assert response.status_code == 200
         
         # Get summary
-        summary_response = client.get(f"/experiments/{exp_id}/metrics/summary")
+        summary_response = await client.get(f"/experiments/{exp_id}/metrics/summary")
         assert summary_response.status_code == 200
         summary = summary_response.json()
         
@@ -448,11 +550,11 @@ class TestIntegration:
         assert metric_names == {"train_loss", "val_loss", "accuracy"}
         
         # Update experiment status
-        client.put(
+        await client.put(
             f"/experiments/{exp_id}/status",
             json={"status": "completed"}
         )
         
         # Verify experiment is completed
-        exp_response = client.get(f"/experiments/{exp_id}")
+        exp_response = await client.get(f"/experiments/{exp_id}")
         assert exp_response.json()["status"] == "completed"
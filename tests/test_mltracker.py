@@ -0,0 +1,28 @@
+from pathlib import Path
+
+import pytest
+
+from mltracker import SimpleMLTracker
+
+ROOT = Path(__file__).resolve().parent.parent
+
+
+def test_downloadable_client_matches_root_copy():
+    """The integration page serves frontend/public/mltracker.py; keep it in sync"""
+    root_copy = (ROOT / "mltracker.py").read_bytes()
+    served_copy = (ROOT / "frontend" / "public" / "mltracker.py").read_bytes()
+    assert served_copy == root_copy, "copy mltracker.py to frontend/public/ after editing it"
+
+
+@pytest.mark.parametrize("value,step,accepted", [
+    (0.5, 0, True),
+    (0.0, 0, True),
+    (0.5, None, False),
+    (0.5, -1, False),
+    (float("nan"), 0, False),
+    (1e39, 0, False),
+    (1e-50, 0, False),
+])
+def test_client_drops_metrics_the_api_rejects(value, step, accepted):
+    """The client's pre-queue check mirrors MetricCreate's validation"""
+    assert (SimpleMLTracker._invalid_metric("loss", value, step) is None) is accepted